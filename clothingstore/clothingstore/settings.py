@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sitemaps',
+    'django.contrib.postgres',
     'user',
     'owner',
     'ckeditor',
@@ -156,6 +157,17 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'  # Add this line ✅
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Public images are content-addressed (user/storage.py): hashed names, one
+# copy of identical bytes, immutable URLs. When a front server serves
+# MEDIA_ROOT instead of Django, give it the same headers as serve_media, e.g.
+# nginx: location ~ "\.[0-9a-f]{16}(-[0-9]+w)?\.[a-z0-9]+$" {
+#            add_header Cache-Control "public, max-age=31536000, immutable"; }
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'media': {'BACKEND': 'user.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -187,6 +199,38 @@ SHIPORT_API_CUSTOMER_ID = os.getenv("SHIPORT_API_CUSTOMER_ID")
 SHIPORT_WAREHOUSE_ADDRESS_ID = os.getenv("SHIPORT_WAREHOUSE_ADDRESS_ID")
 
 
+# Course videos and PDFs are served by user/streaming.py after the enrollment
+# check. Set PROTECTED_MEDIA_OFFLOAD to 'x-accel-redirect' (nginx, with an
+# `internal` location at PROTECTED_MEDIA_INTERNAL_URL aliasing MEDIA_ROOT) or
+# 'x-sendfile' (Apache/lighttpd) to let the front server send the bytes. The
+# public /media/ location should then deny courses/videos/ and courses/pdfs/.
+PROTECTED_MEDIA_OFFLOAD = os.getenv("PROTECTED_MEDIA_OFFLOAD") or None
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
+
+# Caches
+# "catalog" holds versioned catalog data (user/catalog_cache.py). It is
+# per-process local memory unless CATALOG_CACHE_URL points at a shared Redis
+# (e.g. redis://127.0.0.1:6379/1). With DEBUG off the app refuses to start
+# without it, so one admin edit invalidates every gunicorn worker.
+CATALOG_CACHE_URL = os.getenv("CATALOG_CACHE_URL")
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CATALOG_CACHE_URL,
+        'TIMEOUT': 60 * 60,
+    } if CATALOG_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+
 
 
 AUTH_USER_MODEL = 'user.CustomUser'
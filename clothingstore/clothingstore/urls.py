@@ -22,15 +22,12 @@ from django.contrib import admin
 import nested_admin
 from django.urls import path
 
-# Import sitemap-related classes
-from django.contrib.sitemaps.views import sitemap
-from user.sitemaps import ProductSitemap
+# Sitemap index + streamed section files (user/sitemaps.py)
+from user.sitemaps import sitemap_index, sitemap_section
+# Media with immutable Cache-Control for content-hashed names (user/storage.py)
+from user.storage import serve_media
 from django.views.generic import TemplateView
 
-sitemaps = {
-    'products': ProductSitemap,
-}
-
 urlpatterns = [
     # Main project URLs
     path('admin/', admin.site.urls),
@@ -40,9 +37,10 @@ urlpatterns = [
     
     # Add the URL patterns for robots.txt and sitemap.xml
     path('robots.txt', TemplateView.as_view(template_name='robots.txt', content_type='text/plain')),
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap.xml', sitemap_index, name='sitemap_index'),
+    path('sitemap-<slug:section>-<int:page>.xml', sitemap_section, name='sitemap_section'),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
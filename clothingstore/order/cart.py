@@ -0,0 +1,175 @@
+"""
+Cart writes as single-statement upserts.
+
+Adding packs used to be get product, get color, get_or_create, then
+`quantity += n; save()`: four round trips, and two quick clicks could both
+read the same quantity and lose one of the adds. `upsert_lines` does any
+number of (product, color, packs) lines in one PostgreSQL statement:
+
+    INSERT INTO order_cartitem (...) SELECT ... FROM (VALUES ...) JOIN product JOIN color
+    ON CONFLICT (user_id, product_id, color_id)
+        DO UPDATE SET quantity = order_cartitem.quantity + EXCLUDED.quantity
+        WHERE <new quantity> <= <color stock>
+
+The snapshot columns (name, image, prices) come from the joined product, and
+the stock guard is evaluated on the locked row, so concurrent adds can
+neither lose an increment nor push a line past the color's stock. Lines
+missing from the returned rows were rejected (unknown product/color, or not
+enough stock).
+
+`add_packs` is the single-line path used by add_to_cart_view; `quick_order`
+validates many lines with one query and writes them in one transaction.
+"""
+from django.db import connection, transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from user.models import Product, ProductColor
+from user.pagination import BIGINT_MAX
+from .models import CartItem
+
+MAX_QUICK_ORDER_LINES = 200
+MAX_PACKS_PER_LINE = 10000
+NOT_FOUND = "Product or color not found."
+
+
+class CartError(Exception):
+    """A cart write that was refused; `errors` maps line index -> message (quick order)."""
+
+    def __init__(self, message, errors=None, status=400):
+        super().__init__(message)
+        self.errors = errors or {}
+        self.status = status
+
+
+def parse_line(product_id, color_id, packs):
+    """
+    The ints of one requested line, or CartError. Ids must fit the bigint
+    keys and packs MAX_PACKS_PER_LINE, so no value can overflow a column.
+    """
+    try:
+        product_id, color_id, packs = int(product_id), int(color_id), int(packs)
+    except (TypeError, ValueError):
+        raise CartError("Product, color and quantity of sets must be whole numbers.")
+    if not (0 < product_id <= BIGINT_MAX and 0 < color_id <= BIGINT_MAX):
+        raise CartError("Invalid product or color.")
+    if not 1 <= packs <= MAX_PACKS_PER_LINE:
+        raise CartError(f"Quantity of sets must be between 1 and {MAX_PACKS_PER_LINE}.")
+    return product_id, color_id, packs
+
+
+def _merge(lines):
+    """Sums packs of repeated (product, color) lines: one row can only be upserted once per statement."""
+    merged = {}
+    for product_id, color_id, packs in lines:
+        key = (int(product_id), int(color_id))
+        merged[key] = merged.get(key, 0) + int(packs)
+    return merged
+
+
+def _upsert_sql(line_count):
+    cart, product, color = CartItem._meta.db_table, Product._meta.db_table, ProductColor._meta.db_table
+    values = ', '.join(['(%s::bigint, %s::bigint, %s::integer)'] * line_count)
+    return f"""
+        WITH req (product_id, color_id, packs) AS (VALUES {values})
+        INSERT INTO {cart} (user_id, product_id, color_id, quantity,
+                            product_name, product_image, actual_price, discount_price, added_at)
+        SELECT %s, p.id, c.id, req.packs, p.name, p.primary_image, p.price, p.discount_price, NOW()
+          FROM req
+          JOIN {product} p ON p.id = req.product_id
+          JOIN {color} c ON c.id = req.color_id AND c.product_id = p.id
+         WHERE req.packs <= c.stock
+        ON CONFLICT (user_id, product_id, color_id) DO UPDATE
+           SET quantity = {cart}.quantity + EXCLUDED.quantity
+         WHERE {cart}.quantity::bigint + EXCLUDED.quantity <= (SELECT stock FROM {color} WHERE id = EXCLUDED.color_id)
+        RETURNING product_id, color_id, quantity
+    """
+
+
+def upsert_lines(user_id, lines):
+    """
+    Adds [(product_id, color_id, packs), ...] to the user's cart in one
+    statement. Returns {(product_id, color_id): quantity now in the cart}
+    for the lines that were written.
+    """
+    merged = _merge(lines)
+    if not merged:
+        return {}
+    params = [value for (product_id, color_id), packs in merged.items() for value in (product_id, color_id, packs)]
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql(len(merged)), params + [user_id])
+        return {(product_id, color_id): quantity for product_id, color_id, quantity in cursor.fetchall()}
+
+
+def _availability(user_id, color_ids):
+    """One query: {color_id: (product_id, color name, stock, packs already in the cart)}."""
+    in_cart = CartItem.objects.filter(user_id=user_id, color_id=OuterRef('pk')).values('quantity')[:1]
+    rows = (ProductColor.objects.filter(id__in=color_ids)
+            .annotate(in_cart=Coalesce(Subquery(in_cart, output_field=IntegerField()), Value(0)))
+            .values_list('id', 'product_id', 'name', 'stock', 'in_cart'))
+    return {pk: (product_id, name, stock, in_cart) for pk, product_id, name, stock, in_cart in rows}
+
+
+def _line_error(line, available):
+    product_id, color_id, packs = line
+    found = available.get(color_id)
+    if found is None or found[0] != product_id:
+        return NOT_FOUND
+    _, name, stock, in_cart = found
+    if packs + in_cart > stock:
+        message = f"Not enough stock for {name}. Only {stock} sets are available."
+        if in_cart:
+            message += f" You already have {in_cart} in your cart."
+        return message
+    return None
+
+
+def add_packs(user, product_id, color_id, packs):
+    """Adds packs of one color; returns the new cart quantity or raises CartError."""
+    written = upsert_lines(user.pk, [(product_id, color_id, packs)])
+    key = (int(product_id), int(color_id))
+    if key in written:
+        return written[key]
+    # Refused: one more query, only on this path, to say why.
+    error = _line_error((*key, int(packs)), _availability(user.pk, [key[1]]))
+    raise CartError(error, status=404 if error == NOT_FOUND else 400)
+
+
+def quick_order(user, lines):
+    """
+    B2B quick order: validates every (product_id, color_id, packs) line with
+    one stock query, then upserts all of them in one transaction. All or
+    nothing: any invalid line raises CartError with per-line `errors`.
+    """
+    if not lines:
+        raise CartError("No lines given.")
+    if len(lines) > MAX_QUICK_ORDER_LINES:
+        raise CartError(f"At most {MAX_QUICK_ORDER_LINES} lines per quick order.")
+
+    errors = {}
+    parsed = []
+    for index, line in enumerate(lines):
+        try:
+            parsed.append((index, parse_line(*(line[k] for k in ('product_id', 'color_id', 'packs')))))
+        except (KeyError, TypeError):
+            errors[index] = "Each line needs integer product_id, color_id and packs."
+        except CartError as e:
+            errors[index] = str(e)
+    if errors:
+        raise CartError("Some lines are invalid.", errors)
+
+    merged = _merge(line for _, line in parsed)
+    with transaction.atomic():
+        available = _availability(user.pk, {color_id for _, color_id in merged})
+        for index, (product_id, color_id, _) in parsed:
+            error = _line_error((product_id, color_id, merged[product_id, color_id]), available)
+            if error:
+                errors[index] = error
+        if errors:
+            raise CartError("Some lines cannot be added.", errors)
+
+        written = upsert_lines(user.pk, [(p, c, packs) for (p, c), packs in merged.items()])
+        if len(written) != len(merged):
+            # Stock moved between the check and the write; the guard refused a line.
+            raise CartError("Stock changed while adding; nothing was added. Please try again.")
+    return written
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0010_remove_order_status_order_payment_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cartitem',
+            name='product_image',
+            field=models.ImageField(max_length=255, upload_to='cart_snapshots/'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='product_image',
+            field=models.ImageField(max_length=255, upload_to='order_snapshots/'),
+        ),
+    ]
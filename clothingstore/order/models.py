@@ -10,7 +10,7 @@ class CartItem(models.Model):
     color = models.ForeignKey(ProductColor, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField(default=1) # Quantity of PACKS/SETS
     product_name = models.CharField(max_length=255)
-    product_image = models.ImageField(upload_to='cart_snapshots/')
+    product_image = models.ImageField(upload_to='cart_snapshots/', max_length=255)  # holds the product's hashed image name
     actual_price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     added_at = models.DateTimeField(auto_now_add=True)
@@ -92,7 +92,7 @@ class OrderItem(models.Model):
     color = models.ForeignKey(ProductColor, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField()
     product_name = models.CharField(max_length=255)
-    product_image = models.ImageField(upload_to='order_snapshots/')
+    product_image = models.ImageField(upload_to='order_snapshots/', max_length=255)  # holds the product's hashed image name
     actual_price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     price_per_piece_at_purchase = models.DecimalField(max_digits=10, decimal_places=2)
@@ -7,6 +7,7 @@ from . import views
 urlpatterns = [
     # Cart operations
     path('add/', views.add_to_cart_view, name='add_to_cart'),
+    path('quick-order/', views.quick_order_view, name='quick_order'),
     path('cart/', views.view_cart, name='view_cart'),
     path('cart/remove/<str:key>/', views.remove_from_cart, name='remove_from_cart'),
     path('cart/remove/db/<int:item_id>/', views.remove_from_cart, name='remove_from_cart_db'),
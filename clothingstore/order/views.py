@@ -25,6 +25,9 @@ from django.db.models import F
 # --- Model Imports ---
 from .models import CartItem, Order, OrderItem, Coupon
 from user.models import CustomUser, Product, ProductColor
+from user.product_bundle import invalidate_products
+from user.signals import bump_version
+from .cart import CartError, add_packs, parse_line, quick_order
 
 # --- Service/Util Imports ---
 from .shiport_utils import get_cheapest_shipping_rate as get_shiport_rate
@@ -50,6 +53,7 @@ def reduce_product_stock(order):
     """
     print(f"Attempting to reduce stock for Order #{order.id}")
     
+    product_ids = set()
     for item in order.items.all():
         if item.color:
             try:
@@ -71,10 +75,20 @@ def reduce_product_stock(order):
                     )
                 
                 print(f"Successfully reduced stock for {item.product_name} ({item.color.name})")
+                product_ids.add(item.color.product_id)
 
             except ProductColor.DoesNotExist:
                 raise IntegrityError(f"ProductColor with id {item.color.id} does not exist.")
 
+    # Keep Product.total_stock / has_stock in step, in this same transaction
+    if product_ids:
+        Product.objects.filter(id__in=product_ids).refresh_stock()
+        # Stock counts are shown on these products' cached pages only...
+        transaction.on_commit(lambda: invalidate_products(product_ids))
+        # ...unless one sold out: cached in-stock listings must drop it
+        if Product.objects.filter(id__in=product_ids, has_stock=False).exists():
+            transaction.on_commit(bump_version)
+
 
 # ####################################################################
 # CART & CHECKOUT VIEWS
@@ -83,36 +97,10 @@ def reduce_product_stock(order):
 def add_product_pack_to_cart(request, product_id, color_id, quantity_of_packs):
     """
     Helper function to add a specific quantity of product packs to the cart.
-    Stock checking should be done *before* calling this.
+    One atomic upsert with its own stock guard (order/cart.py); returns the
+    new quantity or raises CartError.
     """
-    user = request.user
-    product = get_object_or_404(Product, id=product_id)
-    color = get_object_or_404(ProductColor, id=color_id) if color_id else None
-
-    # Retrieve snapshot data
-    product_name = product.name
-    product_image = product.primary_image.url if product.primary_image else ''
-    actual_price = product.price
-    discount_price = product.discount_price
-
-    cart_item, created = CartItem.objects.get_or_create(
-        user=user,
-        product=product,
-        color=color,
-        defaults={
-            'quantity': quantity_of_packs,
-            'product_name': product_name,
-            'product_image': product_image,
-            'actual_price': actual_price,
-            'discount_price': discount_price
-        }
-    )
-    if not created:
-        # Item already exists, update its quantity
-        cart_item.quantity += quantity_of_packs
-        cart_item.save()
-
-    return cart_item
+    return add_packs(request.user, product_id, color_id, quantity_of_packs)
 
 
 @login_required(login_url='login')
@@ -126,46 +114,54 @@ def add_to_cart_view(request):
         return JsonResponse({'status': 'error', 'message': 'Product or color not selected.'}, status=400)
 
     try:
-        set_quantity = int(set_quantity_str)
-        if set_quantity < 1:
-            return JsonResponse({'status': 'error', 'message': 'Quantity of sets must be at least 1.'}, status=400)
-    except (ValueError, TypeError):
-        return JsonResponse({'status': 'error', 'message': 'Invalid quantity provided for sets.'}, status=400)
+        product_id, color_id, set_quantity = parse_line(product_id, color_id, set_quantity_str)
+    except CartError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=e.status)
 
     try:
-        product = get_object_or_404(Product, id=product_id)
-        color = get_object_or_404(ProductColor, id=color_id)
-
-        # --- ✅ STOCK CHECK ---
-        # Find existing cart item to check total quantity
-        cart_item = CartItem.objects.filter(user=request.user, product=product, color=color).first()
-        current_cart_qty = cart_item.quantity if cart_item else 0
-        total_qty_needed = current_cart_qty + set_quantity
-
-        if color.stock < total_qty_needed:
-            message = f"Not enough stock. Only {color.stock} sets are available."
-            if current_cart_qty > 0:
-                message += f" You already have {current_cart_qty} in your cart."
-            return JsonResponse({'status': 'error', 'message': message}, status=400)
-        # --- END STOCK CHECK ---
-
-        # Use the helper function
+        # --- ✅ STOCK CHECK + ADD in one statement ---
         add_product_pack_to_cart(request, product_id, color_id, set_quantity)
-        
+
         return JsonResponse({
             'status': 'success',
             'message': f'{set_quantity} sets added to bag!',
             'cart_url': redirect('view_cart').url
         })
-    except Product.DoesNotExist:
-        return JsonResponse({'status': 'error', 'message': 'Product not found.'}, status=404)
-    except ProductColor.DoesNotExist:
-        return JsonResponse({'status': 'error', 'message': 'Color not found.'}, status=404)
+    except CartError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=e.status)
     except Exception as e:
         print(f"Error adding to cart: {e}")
         return JsonResponse({'status': 'error', 'message': 'An unexpected error occurred.'}, status=500)
 
 
+@login_required(login_url='login')
+@require_POST
+def quick_order_view(request):
+    """
+    B2B quick order pad: POST JSON {"lines": [{"product_id", "color_id", "packs"}, ...]}.
+    All lines are validated with one stock query and added in one transaction,
+    or none are (errors are reported per line index).
+    """
+    try:
+        lines = json.loads(request.body).get('lines')
+    except (ValueError, AttributeError):
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
+    if not isinstance(lines, list):
+        return JsonResponse({'status': 'error', 'message': '"lines" must be a list.'}, status=400)
+
+    try:
+        written = quick_order(request.user, lines)
+    except CartError as e:
+        return JsonResponse({'status': 'error', 'message': str(e), 'errors': e.errors}, status=400)
+
+    return JsonResponse({
+        'status': 'success',
+        'message': f'{len(written)} lines added to bag!',
+        'lines': [{'product_id': p, 'color_id': c, 'quantity': q} for (p, c), q in written.items()],
+        'cart_url': redirect('view_cart').url
+    })
+
+
 @login_required(login_url='login')
 def view_cart(request):
     cart_items_for_display = []
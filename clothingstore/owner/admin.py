@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from user.images import thumbnail_url
 from .models import Blog, BlogCategory, BlogTag
 
 
@@ -111,7 +112,7 @@ class BlogAdmin(admin.ModelAdmin):
         if obj.thumbnail:
             return format_html(
                 '<img src="{}" width="60" height="60" style="border-radius:8px; object-fit:cover;" />',
-                obj.thumbnail.url
+                thumbnail_url(obj, 'thumbnail')
             )
         return "No Thumbnail"
 
@@ -121,7 +122,7 @@ class BlogAdmin(admin.ModelAdmin):
         if obj.main_image:
             return format_html(
                 '<img src="{}" width="180" style="border-radius:10px; object-fit:cover;" />',
-                obj.main_image.url
+                thumbnail_url(obj, 'main_image')
             )
         return "No Image"
 
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:01
+
+import user.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('owner', '0003_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blog',
+            name='image_1',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='blogs/'),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='image_2',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='blogs/'),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='image_3',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='blogs/'),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='image_4',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='blogs/'),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='image_5',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='blogs/'),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='main_image',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='blogs/'),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='thumbnail',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='blogs/thumbnails/'),
+        ),
+    ]
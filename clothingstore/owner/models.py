@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils.text import slugify
 from django.conf import settings
+from user.storage import media_storage
 import math
 import re
 
@@ -68,14 +69,15 @@ class Blog(models.Model):
     )
 
     # IMAGES
-    thumbnail = models.ImageField(upload_to="blogs/thumbnails/", blank=True, null=True)
-    main_image = models.ImageField(upload_to="blogs/", blank=True, null=True)
-
-    image_1 = models.ImageField(upload_to="blogs/", blank=True, null=True)
-    image_2 = models.ImageField(upload_to="blogs/", blank=True, null=True)
-    image_3 = models.ImageField(upload_to="blogs/", blank=True, null=True)
-    image_4 = models.ImageField(upload_to="blogs/", blank=True, null=True)
-    image_5 = models.ImageField(upload_to="blogs/", blank=True, null=True)
+    thumbnail = models.ImageField(upload_to="blogs/thumbnails/", storage=media_storage, max_length=255, blank=True, null=True)
+    main_image = models.ImageField(upload_to="blogs/", storage=media_storage, max_length=255, blank=True, null=True)
+
+    image_1 = models.ImageField(upload_to="blogs/", storage=media_storage, max_length=255, blank=True, null=True)
+    image_2 = models.ImageField(upload_to="blogs/", storage=media_storage, max_length=255, blank=True, null=True)
+    image_3 = models.ImageField(upload_to="blogs/", storage=media_storage, max_length=255, blank=True, null=True)
+    image_4 = models.ImageField(upload_to="blogs/", storage=media_storage, max_length=255, blank=True, null=True)
+    image_5 = models.ImageField(upload_to="blogs/", storage=media_storage, max_length=255, blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # user/images.py
 
     # TEXT CONTENT
     subtitle_1 = models.CharField(max_length=300, blank=True, null=True)
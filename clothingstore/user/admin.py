@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Product, ProductColor, ProductImage, CustomUser, Course, CourseVideo, CoursePDF, CourseEnrollment
+from .models import Category, Product, ProductAttribute, ProductColor, ProductImage, CustomUser, Course, CourseVideo, CoursePDF, CourseEnrollment, ProductViewDaily, SearchQueryDaily
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from .images import thumbnail_url
 
 # -------------------------------------------
 # Inline: Product Images under ProductColor
@@ -15,7 +16,7 @@ class ProductImageInline(admin.TabularInline):
 
     def preview(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="height:80px;" />', obj.image.url)
+            return format_html('<img src="{}" style="height:80px;" />', thumbnail_url(obj, 'image'))
         return "No Image"
     preview.short_description = "Preview"
 
@@ -35,20 +36,36 @@ class ProductColorInline(admin.TabularInline):
         return "-"
     color_box.short_description = "Color"
 
+# -------------------------------------------
+# Inline: extracted attributes under Product (read-only)
+# -------------------------------------------
+class ProductAttributeInline(admin.TabularInline):
+    model = ProductAttribute
+    extra = 0
+    fields = ('name', 'value')
+    readonly_fields = ('name', 'value')
+    can_delete = False
+    verbose_name_plural = "Extracted attributes (from the description)"
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 # -------------------------------------------
 # Admin: Product
 # -------------------------------------------
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('thumbnail', 'name', 'price', 'discount_price', 'weight', 'get_categories', 'get_primary_color')
-    list_filter = ('categories',)
+    list_display = ('thumbnail', 'name', 'price', 'discount_price', 'weight', 'get_categories', 'get_primary_color', 'total_stock')
+    list_filter = ('categories', 'has_stock')
+    list_select_related = ('primary_color',)
     search_fields = ('name', 'slug')
     prepopulated_fields = {"slug": ("name",)}
     filter_horizontal = ('categories',)
-    inlines = [ProductColorInline]
+    inlines = [ProductColorInline, ProductAttributeInline]
+    readonly_fields = ('total_pieces', 'total_stock')
 
     fieldsets = (
         (None, {
-            'fields': ('name', 'slug', 'categories', 'price', 'discount_price', 'sizes', 'size_chart')
+            'fields': ('name', 'slug', 'categories', 'price', 'discount_price', ('sizes', 'total_pieces'), 'total_stock', 'size_chart')
         }),
         ("Shipping Details (kg & cm)", {
             'fields': ('weight', 'length', 'width', 'height')
@@ -71,13 +88,12 @@ class ProductAdmin(admin.ModelAdmin):
     get_categories.short_description = 'Categories'
 
     def get_primary_color(self, obj):
-        primary = obj.colors.filter(is_primary=True).first()
-        return primary.name if primary else "-"
+        return obj.primary_color.name if obj.primary_color else "-"
     get_primary_color.short_description = 'Primary Color'
 
     def thumbnail(self, obj):
         if obj.primary_image:
-            return format_html('<img src="{}" style="height:50px;" />', obj.primary_image.url)
+            return format_html('<img src="{}" style="height:50px;" />', thumbnail_url(obj, 'primary_image'))
         return "-"
     thumbnail.short_description = 'Image'
 
@@ -85,8 +101,8 @@ class ProductAdmin(admin.ModelAdmin):
 # Admin: ProductColor
 # -------------------------------------------
 class ProductColorAdmin(admin.ModelAdmin):
-    list_display = ('product', 'name', 'hex_code', 'is_primary', 'stock', 'color_box')
-    list_filter = ('product', 'is_primary')
+    list_display = ('product', 'name', 'hex_code', 'family', 'is_primary', 'stock', 'color_box')
+    list_filter = ('family', 'is_primary', 'product')
     search_fields = ('product__name', 'name')
     inlines = [ProductImageInline]
     list_editable = ('stock',)
@@ -108,7 +124,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
     def image_tag(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="height:40px;" />', obj.image.url)
+            return format_html('<img src="{}" style="height:40px;" />', thumbnail_url(obj, 'image'))
         return "No Image"
     image_tag.short_description = 'Image'
 
@@ -119,6 +135,36 @@ admin.site.register(Category, CategoryAdmin)
 admin.site.register(Product, ProductAdmin)
 admin.site.register(ProductColor, ProductColorAdmin)
 
+# -------------------------------------------
+# Admin: Shopper event rollups (read-only)
+# -------------------------------------------
+@admin.register(ProductViewDaily)
+class ProductViewDailyAdmin(admin.ModelAdmin):
+    list_display = ('day', 'product', 'views')
+    list_filter = ('day',)
+    search_fields = ('product__name',)
+    ordering = ('-day', '-views')
+    list_select_related = ('product',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(SearchQueryDaily)
+class SearchQueryDailyAdmin(admin.ModelAdmin):
+    list_display = ('day', 'kind', 'query', 'count', 'zero_results')
+    list_filter = ('kind', 'day')
+    search_fields = ('query',)
+    ordering = ('-day', '-count')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 # -------------------------------------------
 # Admin: CustomUser
 # -------------------------------------------
@@ -0,0 +1,125 @@
+"""
+Structured product attributes (sleeve, fabric, fit, neckline) extracted from
+the product text.
+
+The name, description and html_description (tags stripped) are matched
+against a keyword dictionary: every attribute value lists the phrases that
+imply it, matched on word boundaries, with spaces and hyphens treated alike
+("full sleeve", "full-sleeve"). The result is stored as ProductAttribute rows
+by Product.save(), so the facet index and the filters read an indexed table
+instead of searching descriptions per request.
+
+Override or extend the dictionary with settings.PRODUCT_ATTRIBUTE_KEYWORDS
+(same shape as DEFAULT_KEYWORDS, merged per attribute), then re-run
+`manage.py extract_attributes`.
+"""
+import re
+
+from django.conf import settings
+from django.utils.html import strip_tags
+
+# attribute -> {value: [phrases]}
+DEFAULT_KEYWORDS = {
+    'sleeve': {
+        'Full Sleeve': ['full sleeve', 'full sleeves', 'long sleeve', 'long sleeves'],
+        'Half Sleeve': ['half sleeve', 'half sleeves', 'short sleeve', 'short sleeves'],
+        'Sleeveless': ['sleeveless', 'tank top', 'vest'],
+    },
+    'fabric': {
+        'Cotton': ['cotton'],
+        'Denim': ['denim'],
+        'Linen': ['linen'],
+        'Fleece': ['fleece'],
+        'Polyester': ['polyester'],
+        'Rayon': ['rayon', 'viscose'],
+        'Lycra': ['lycra', 'spandex', 'elastane'],
+        'Wool': ['wool', 'woollen', 'woolen'],
+    },
+    'fit': {
+        'Oversized': ['oversized', 'oversize', 'drop shoulder'],
+        'Slim': ['slim fit', 'skinny'],
+        'Regular': ['regular fit'],
+        'Relaxed': ['relaxed fit', 'loose fit', 'baggy'],
+    },
+    'neckline': {
+        'Round Neck': ['round neck', 'crew neck', 'crewneck'],
+        'V Neck': ['v neck'],
+        'Polo Collar': ['polo collar', 'polo neck'],
+        'Hooded': ['hooded', 'hoodie'],
+        'Turtle Neck': ['turtle neck', 'turtleneck', 'high neck'],
+        'Henley': ['henley'],
+    },
+}
+
+ATTRIBUTES = tuple(DEFAULT_KEYWORDS)
+
+
+def keyword_dictionary():
+    keywords = {name: dict(values) for name, values in DEFAULT_KEYWORDS.items()}
+    for name, values in getattr(settings, 'PRODUCT_ATTRIBUTE_KEYWORDS', {}).items():
+        keywords.setdefault(name, {}).update(values)
+    return keywords
+
+
+def attribute_options(name):
+    """Display values of one attribute, in dictionary order (filter panels)."""
+    return list(keyword_dictionary().get(name, {}))
+
+
+def _phrase_pattern(phrase):
+    return r'[\s-]+'.join(re.escape(word) for word in phrase.lower().split())
+
+
+def _compile(keywords):
+    compiled = []
+    for name, values in keywords.items():
+        for value, phrases in values.items():
+            if phrases:
+                pattern = r'\b(?:%s)\b' % '|'.join(_phrase_pattern(p) for p in phrases)
+                compiled.append((name, value, re.compile(pattern)))
+    return compiled
+
+
+_matchers = None
+
+
+def _get_matchers():
+    global _matchers
+    if _matchers is None:
+        _matchers = _compile(keyword_dictionary())
+    return _matchers
+
+
+def extract_attributes(*texts):
+    """{(attribute, value), ...} found in the given texts; HTML is stripped."""
+    text = ' '.join(strip_tags(t or '') for t in texts).lower()
+    return {(name, value) for name, value, pattern in _get_matchers() if pattern.search(text)}
+
+
+def product_attributes(product):
+    return extract_attributes(product.name, product.description, product.html_description)
+
+
+def extract_all(batch_size=500, stdout=None):
+    """Re-extracts every product's attributes in batches; returns (products, rows)."""
+    from .models import Product, ProductAttribute
+
+    products = rows = 0
+    queryset = Product.objects.only('id', 'name', 'description', 'html_description').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return products, rows
+        new_rows = [
+            ProductAttribute(product_id=product.id, name=name, value=value)
+            for product in batch
+            for name, value in sorted(product_attributes(product))
+        ]
+        ProductAttribute.objects.filter(product_id__in=[p.id for p in batch]).delete()
+        ProductAttribute.objects.bulk_create(new_rows, batch_size=1000)
+        products += len(batch)
+        rows += len(new_rows)
+        last_id = batch[-1].id
+        if stdout:
+            stdout.write(f"  {products} products, {rows} attributes")
@@ -0,0 +1,211 @@
+"""
+Versioned cache for catalog data (categories, product grids, fragments).
+
+Every key embeds a global catalog version:
+
+    catalog:<version>:<name>:<parts...>
+
+The version lives in the "catalog" cache and is bumped by the signal handlers
+in `user/signals.py` whenever staff change a Category, Product, ProductColor
+or ProductImage. Nothing is ever deleted: after a bump every reader simply
+misses onto new keys and the old entries age out, so invalidation is one
+`incr` no matter how many fragments were cached. The version must live in a
+cache every worker shares (Redis or memcached), which `check_shared_cache`
+enforces outside DEBUG.
+
+Changes that touch a few products without altering any listing (stock
+counts, recomputed related products) don't bump: `forget` deletes just those
+products' entries under the current version (see
+`product_bundle.invalidate_products`).
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import caches
+from django.template.loader import render_to_string
+
+CACHE_ALIAS = 'catalog'
+VERSION_KEY = 'catalog:version'
+POPULARITY_KEY = 'catalog:popularity-version'
+PER_PROCESS_BACKENDS = ('LocMemCache', 'DummyCache')
+DEFAULT_TIMEOUT = 60 * 60
+
+_MISSING = object()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS if CACHE_ALIAS in settings.CACHES else 'default']
+
+
+# -----------------------------------------------------------
+# 1. HIT / MISS COUNTERS
+# -----------------------------------------------------------
+class CacheStats:
+    """Per-process counters, keyed by cache name ('categories', 'card', ...)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name, hit, count=1):
+        with self._lock:
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += count
+
+    def snapshot(self):
+        with self._lock:
+            items = {name: tuple(counts) for name, counts in self._counts.items()}
+        report = {}
+        for name, (hits, misses) in sorted(items.items()):
+            total = hits + misses
+            report[name] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / total, 3) if total else None,
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+
+
+stats = CacheStats()
+
+
+# -----------------------------------------------------------
+# 2. CATALOG VERSION
+# -----------------------------------------------------------
+def _counter(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock, so a version lost to eviction or a restart can
+        # never line up with keys written under an older one.
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        return get_cache().incr(key)
+    except ValueError:
+        # Key missing: seeding it is as good as a bump.
+        return _counter(key)
+
+
+def catalog_version():
+    return _counter(VERSION_KEY)
+
+
+def bump_catalog_version():
+    return _bump(VERSION_KEY)
+
+
+def popularity_version():
+    """
+    A second counter for entries ordered by popularity (popular grids, best
+    sellers): the hourly score update bumps only this one, so it doesn't
+    invalidate everything else or rebuild the facet index and suggester.
+    """
+    return _counter(POPULARITY_KEY)
+
+
+def bump_popularity_version():
+    return _bump(POPULARITY_KEY)
+
+
+def check_shared_cache():
+    """
+    Refuses to run with DEBUG off on a per-process catalog cache: a bump
+    would only reach the process that made it, and every other worker would
+    serve stale entries until they expire. Called from UserConfig.ready().
+    """
+    backend = settings.CACHES.get(CACHE_ALIAS, settings.CACHES['default'])['BACKEND']
+    if not settings.DEBUG and backend.rsplit('.', 1)[-1] in PER_PROCESS_BACKENDS:
+        raise ImproperlyConfigured(
+            f"The '{CACHE_ALIAS}' cache uses {backend}, which is not shared between processes. "
+            "Set CATALOG_CACHE_URL to a Redis server (or configure memcached) for production."
+        )
+
+
+# -----------------------------------------------------------
+# 3. HELPERS FOR VIEWS
+# -----------------------------------------------------------
+def versioned_key(name, *parts, version=None):
+    if version is None:
+        version = catalog_version()
+    suffix = ':'.join(str(part) for part in parts)
+    if len(suffix) > 120 or any(c.isspace() for c in suffix):
+        # Keep keys short and memcached-safe whatever the query string holds.
+        suffix = hashlib.md5(suffix.encode()).hexdigest()
+    return f"catalog:{version}:{name}:{suffix}"
+
+
+def get_or_set(name, producer, *parts, timeout=DEFAULT_TIMEOUT):
+    """Returns the cached value for (name, *parts), calling producer() on a miss."""
+    cache = get_cache()
+    key = versioned_key(name, *parts)
+    value = cache.get(key, _MISSING)
+    stats.record(name, value is not _MISSING)
+    if value is _MISSING:
+        value = producer()
+        cache.set(key, value, timeout)
+    return value
+
+
+def forget(entries):
+    """Deletes the current-version entries for [(name, *parts), ...]."""
+    version = catalog_version()
+    get_cache().delete_many([versioned_key(*entry, version=version) for entry in entries])
+
+
+def cached_queryset(name, queryset, *parts, timeout=DEFAULT_TIMEOUT):
+    """Evaluates `queryset` once per catalog version and returns it as a list."""
+    return get_or_set(name, lambda: list(queryset), *parts, timeout=timeout)
+
+
+def cached_fragment(name, template_name, context, *parts, timeout=DEFAULT_TIMEOUT):
+    """
+    Rendered HTML for a template that depends only on catalog data. There is
+    no request, so the template must not need context processors or csrf.
+    """
+    return get_or_set(name, lambda: render_to_string(template_name, context), *parts, timeout=timeout)
+
+
+def cached_fragments(name, template_name, objects, context_name, timeout=DEFAULT_TIMEOUT):
+    """
+    Renders `template_name` once per object (keyed by pk) and returns the HTML
+    strings in order. Hits come back from a single get_many; only the misses
+    are rendered, and they are written back with one set_many.
+    """
+    objects = list(objects)
+    if not objects:
+        return []
+    cache = get_cache()
+    version = catalog_version()
+    keys = [versioned_key(name, obj.pk, version=version) for obj in objects]
+    found = cache.get_many(keys)
+
+    rendered = {}
+    for key, obj in zip(keys, objects):
+        if key not in found and key not in rendered:
+            rendered[key] = render_to_string(template_name, {context_name: obj})
+    if rendered:
+        cache.set_many(rendered, timeout)
+
+    stats.record(name, True, len(keys) - len(rendered))
+    stats.record(name, False, len(rendered))
+    found.update(rendered)
+    return [found[key] for key in keys]
+
+
+def catalog_categories():
+    """All categories; the menu/sidebar list nearly every page renders."""
+    from .models import Category
+
+    return cached_queryset('categories', Category.objects.all())
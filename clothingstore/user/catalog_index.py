@@ -0,0 +1,317 @@
+"""
+In-memory faceted index over the product catalog.
+
+Every facet value (size token, colour family, category name, or an extracted
+attribute such as sleeve type or fabric; see user/attributes.py) owns a
+posting bitmap of product ids, stored as a plain Python int. A filter
+combination is answered with `|` inside a facet and `&` across facets, and the
+per-facet counts are just `int.bit_count()` on the intersections, so the
+listing views never need the OR'd icontains chains or `.distinct()` joins.
+
+The index is built lazily on first use and kept current by the signal
+handlers in `user/signals.py`; changes made in other processes are picked up
+through the catalog version in `user/catalog_cache.py`.
+"""
+import bisect
+import threading
+from decimal import Decimal, InvalidOperation
+
+from .attributes import attribute_options
+from .catalog_cache import catalog_version
+from .color_families import FAMILIES
+
+# -----------------------------------------------------------
+# 1. FACET VOCABULARY
+# -----------------------------------------------------------
+SIZE_OPTIONS = ["XS", "S", "M", "L", "XL", "XXL", "26", "28", "30", "32", "34", "36", "38", "40", "42"]
+COLOR_OPTIONS = FAMILIES
+SLEEVE_OPTIONS = attribute_options('sleeve')
+FABRIC_OPTIONS = attribute_options('fabric')
+FIT_OPTIONS = attribute_options('fit')
+NECKLINE_OPTIONS = attribute_options('neckline')
+
+FACETS = ('sizes', 'colors', 'categories', 'sleeves', 'fabrics', 'fits', 'necklines')
+
+# ProductAttribute.name -> facet
+ATTRIBUTE_FACETS = {'sleeve': 'sleeves', 'fabric': 'fabrics', 'fit': 'fits', 'neckline': 'necklines'}
+
+
+def normalize_facet_value(value):
+    return str(value).strip().lower()
+
+
+def to_decimal(value):
+    """Parses a price from a query param, returning None for blank/invalid input."""
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def iter_bits(bitmap):
+    """Yields the product ids set in a bitmap, lowest first."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+# -----------------------------------------------------------
+# 2. SEARCH RESULT
+# -----------------------------------------------------------
+class FacetResult:
+    def __init__(self, bitmap, facet_counts, is_filtered, min_price=None, max_price=None):
+        self.bitmap = bitmap
+        self.facet_counts = facet_counts
+        self.is_filtered = is_filtered
+        self.min_price = min_price
+        self.max_price = max_price
+
+    @property
+    def ids(self):
+        return list(iter_bits(self.bitmap))
+
+    @property
+    def count(self):
+        return self.bitmap.bit_count()
+
+    def apply(self, queryset):
+        """
+        Restricts a Product queryset to the matches. The price range goes to
+        SQL as a range on the indexed effective_price column; the id list is
+        only needed when a facet value is selected.
+        """
+        if self.min_price is not None:
+            queryset = queryset.filter(effective_price__gte=self.min_price)
+        if self.max_price is not None:
+            queryset = queryset.filter(effective_price__lte=self.max_price)
+        if not self.is_filtered:
+            return queryset
+        return queryset.filter(id__in=self.ids)
+
+
+# -----------------------------------------------------------
+# 3. THE INDEX
+# -----------------------------------------------------------
+class CatalogIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.is_built = False
+        self.version = None   # catalog version (user/catalog_cache.py) it reflects
+
+    def _reset(self):
+        self._postings = {facet: {} for facet in FACETS}
+        self._doc_values = {}     # product id -> {facet: set(values)}
+        self._prices = {}         # product id -> effective set price
+        self._price_sorted = []   # [(price, product id)] for range scans
+        self._all = 0
+
+    # --- Loading ---------------------------------------------------------
+    def _load_documents(self, product_ids=None):
+        """
+        Reads the indexed attributes with five flat queries.
+        Returns {product_id: (values_by_facet, effective_price)}.
+        """
+        from .models import Product, ProductAttribute, ProductColor, ProductPackSize
+
+        products = Product.objects.all()
+        pack_sizes = ProductPackSize.objects.all()
+        colors = ProductColor.objects.all()
+        memberships = Product.categories.through.objects.all()
+        attributes = ProductAttribute.objects.all()
+        if product_ids is not None:
+            products = products.filter(id__in=product_ids)
+            pack_sizes = pack_sizes.filter(product_id__in=product_ids)
+            colors = colors.filter(product_id__in=product_ids)
+            memberships = memberships.filter(product_id__in=product_ids)
+            attributes = attributes.filter(product_id__in=product_ids)
+
+        docs = {}
+        for pid, effective_price in products.values_list('id', 'effective_price'):
+            docs[pid] = ({facet: set() for facet in FACETS}, effective_price)
+
+        for pid, name, value in attributes.values_list('product_id', 'name', 'value'):
+            if pid in docs and name in ATTRIBUTE_FACETS:
+                docs[pid][0][ATTRIBUTE_FACETS[name]].add(normalize_facet_value(value))
+
+        for pid, size in pack_sizes.values_list('product_id', 'size'):
+            if pid in docs:
+                docs[pid][0]['sizes'].add(normalize_facet_value(size))
+
+        for pid, family in colors.exclude(family='').values_list('product_id', 'family'):
+            if pid in docs:
+                docs[pid][0]['colors'].add(normalize_facet_value(family))
+
+        for pid, name in memberships.values_list('product_id', 'category__name'):
+            if pid in docs:
+                docs[pid][0]['categories'].add(normalize_facet_value(name))
+
+        return docs
+
+    def build(self):
+        docs = self._load_documents()
+        with self._lock:
+            self._reset()
+            for pid, (values, price) in docs.items():
+                self._add(pid, values, price)
+            self._price_sorted.sort()
+            self.is_built = True
+
+    # --- Incremental maintenance ----------------------------------------
+    def _add(self, pid, values, price, keep_sorted=False):
+        bit = 1 << pid
+        for facet, facet_values in values.items():
+            postings = self._postings[facet]
+            for value in facet_values:
+                postings[value] = postings.get(value, 0) | bit
+        self._doc_values[pid] = values
+        self._prices[pid] = price
+        if keep_sorted:
+            bisect.insort(self._price_sorted, (price, pid))
+        else:
+            self._price_sorted.append((price, pid))
+        self._all |= bit
+
+    def _remove(self, pid):
+        values = self._doc_values.pop(pid, None)
+        if values is None:
+            return
+        mask = ~(1 << pid)
+        for facet, facet_values in values.items():
+            postings = self._postings[facet]
+            for value in facet_values:
+                remaining = postings.get(value, 0) & mask
+                if remaining:
+                    postings[value] = remaining
+                else:
+                    postings.pop(value, None)
+        price = self._prices.pop(pid)
+        pos = bisect.bisect_left(self._price_sorted, (price, pid))
+        if pos < len(self._price_sorted) and self._price_sorted[pos] == (price, pid):
+            del self._price_sorted[pos]
+        self._all &= mask
+
+    def refresh_products(self, product_ids):
+        """Re-reads the given products from the DB and swaps their postings."""
+        product_ids = set(product_ids)
+        if not self.is_built or not product_ids:
+            return
+        docs = self._load_documents(product_ids)
+        with self._lock:
+            for pid in product_ids:
+                self._remove(pid)
+                if pid in docs:
+                    values, price = docs[pid]
+                    self._add(pid, values, price, keep_sorted=True)
+
+    def advance(self, version):
+        """
+        Called after this process bumped the catalog version for a change it
+        has already applied incrementally. If some other worker bumped in
+        between, leave the version stale so the next read rebuilds.
+        """
+        if self.version is not None and self.version == version - 1:
+            self.version = version
+
+    def remove_products(self, product_ids):
+        if not self.is_built:
+            return
+        with self._lock:
+            for pid in product_ids:
+                self._remove(pid)
+
+    # --- Querying --------------------------------------------------------
+    def _price_bitmap(self, min_price, max_price):
+        lo = 0
+        hi = len(self._price_sorted)
+        if min_price is not None:
+            lo = bisect.bisect_left(self._price_sorted, (min_price, -1))
+        if max_price is not None:
+            hi = bisect.bisect_right(self._price_sorted, (max_price, float('inf')))
+        bitmap = 0
+        for _, pid in self._price_sorted[lo:hi]:
+            bitmap |= 1 << pid
+        return bitmap
+
+    def search(self, sizes=(), colors=(), categories=(), sleeves=(), fabrics=(), fits=(), necklines=(),
+               min_price=None, max_price=None, restrict_to=None):
+        """
+        Values inside one facet are OR'd, facets are AND'd together.
+        facet_counts[facet][value] is the hit count if that value were
+        selected on top of every *other* active facet (disjunctive faceting).
+        `restrict_to` is a bitmap the matches must also be in (the text hits
+        of a search), so the counts describe what the filters would return.
+        """
+        selected = {
+            'sizes': [normalize_facet_value(v) for v in sizes if v],
+            'colors': [normalize_facet_value(v) for v in colors if v],
+            'categories': [normalize_facet_value(v) for v in categories if v],
+            'sleeves': [normalize_facet_value(v) for v in sleeves if v],
+            'fabrics': [normalize_facet_value(v) for v in fabrics if v],
+            'fits': [normalize_facet_value(v) for v in fits if v],
+            'necklines': [normalize_facet_value(v) for v in necklines if v],
+        }
+        min_price = to_decimal(min_price)
+        max_price = to_decimal(max_price)
+
+        with self._lock:
+            facet_bitmaps = {}
+            for facet, values in selected.items():
+                if values:
+                    postings = self._postings[facet]
+                    bitmap = 0
+                    for value in values:
+                        bitmap |= postings.get(value, 0)
+                    facet_bitmaps[facet] = bitmap
+
+            base = self._all
+            if min_price is not None or max_price is not None:
+                base &= self._price_bitmap(min_price, max_price)
+            if restrict_to is not None:
+                base &= restrict_to
+
+            result = base
+            for bitmap in facet_bitmaps.values():
+                result &= bitmap
+
+            facet_counts = {}
+            for facet in FACETS:
+                others = base
+                for other, bitmap in facet_bitmaps.items():
+                    if other != facet:
+                        others &= bitmap
+                facet_counts[facet] = {
+                    value: (others & posting).bit_count()
+                    for value, posting in self._postings[facet].items()
+                }
+
+        return FacetResult(result, facet_counts, bool(facet_bitmaps), min_price, max_price)
+
+
+# -----------------------------------------------------------
+# 4. PROCESS-WIDE INSTANCE
+# -----------------------------------------------------------
+_index = CatalogIndex()
+_build_lock = threading.Lock()
+
+
+def get_catalog_index():
+    """
+    Returns the index, (re)building it when it is missing or was built for an
+    older catalog version, e.g. after an admin edit handled by another worker.
+    """
+    version = catalog_version()
+    if not _index.is_built or _index.version != version:
+        with _build_lock:
+            if not _index.is_built or _index.version != version:
+                _index.build()
+                _index.version = version
+    return _index
+
+
+def advance_catalog_index(version):
+    """See CatalogIndex.advance; never triggers a build."""
+    _index.advance(version)
@@ -0,0 +1,99 @@
+"""
+Color families for ProductColor.hex_code.
+
+The color filter offers a handful of families ("Blue", "Grey", ...) while
+staff name variants freely ("Navy", "Charcoal", "Teal"). Each hex code is
+converted to CIELAB, where Euclidean distance roughly follows perceived
+difference, and assigned the family of its nearest prototype. A family has
+several prototypes (navy, royal and sky all count as Blue).
+
+ProductColor.save() classifies one color; `classify_all()` (used by the
+migration and `manage.py classify_colors`) does the whole catalog as one
+numpy batch.
+"""
+import re
+
+import numpy as np
+
+# family -> prototype hex codes
+FAMILY_PROTOTYPES = {
+    'Black': ['#000000', '#1C1C1C', '#2B2B2B'],
+    'White': ['#FFFFFF', '#F8F8F0', '#FFFFF0'],
+    'Grey': ['#808080', '#A9A9A9', '#C0C0C0', '#36454F', '#5A5A5A'],
+    'Beige': ['#F5F5DC', '#E8D8B8', '#FFFDD0', '#D2B48C', '#C8AD7F'],
+    'Blue': ['#0000FF', '#000080', '#1F3A93', '#4169E1', '#87CEEB', '#008080', '#4682B4'],
+    'Green': ['#008000', '#556B2F', '#228B22', '#98FF98', '#2E8B57', '#808000'],
+    'Red': ['#FF0000', '#800000', '#DC143C', '#B22222', '#800020', '#722F37'],
+    'Pink': ['#FFC0CB', '#FF69B4', '#E75480', '#F4C2C2'],
+    'Purple': ['#800080', '#6A0DAD', '#E6E6FA', '#8E4585'],
+    'Yellow': ['#FFFF00', '#FFD700', '#E1AD01', '#FFF44F'],
+    'Brown': ['#8B4513', '#A52A2A', '#7B3F00', '#654321', '#6D4C41'],
+    'Orange': ['#FFA500', '#FF7F50', '#EF6C00', '#CC5500'],
+}
+FAMILIES = list(FAMILY_PROTOTYPES)
+
+HEX_RE = re.compile(r'^#?([0-9a-fA-F]{6}|[0-9a-fA-F]{3})$')
+
+# sRGB (D65) -> XYZ
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def parse_hex(value):
+    """'#1f3a93' / '1F3A93' / '#fff' -> (r, g, b) in 0..255, or None."""
+    match = HEX_RE.match((value or '').strip())
+    if not match:
+        return None
+    digits = match.group(1)
+    if len(digits) == 3:
+        digits = ''.join(c * 2 for c in digits)
+    return tuple(int(digits[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def rgb_to_lab(rgb):
+    """(n, 3) array of 0..255 sRGB -> (n, 3) array of CIELAB."""
+    srgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+_prototype_families = [family for family, codes in FAMILY_PROTOTYPES.items() for _ in codes]
+_prototype_lab = rgb_to_lab([parse_hex(code) for codes in FAMILY_PROTOTYPES.values() for code in codes])
+
+
+def classify(hex_codes):
+    """Family name for each hex code ('' where it does not parse), in one vectorized pass."""
+    parsed = [parse_hex(code) for code in hex_codes]
+    valid = [i for i, rgb in enumerate(parsed) if rgb is not None]
+    families = [''] * len(parsed)
+    if valid:
+        lab = rgb_to_lab([parsed[i] for i in valid])
+        distances = ((lab[:, None, :] - _prototype_lab[None, :, :]) ** 2).sum(axis=2)
+        for i, nearest in zip(valid, distances.argmin(axis=1)):
+            families[i] = _prototype_families[nearest]
+    return families
+
+
+def color_family(hex_code):
+    return classify([hex_code])[0]
+
+
+def classify_all(model=None, batch_size=5000):
+    """Re-classifies every ProductColor; returns the number of rows changed."""
+    if model is None:
+        from .models import ProductColor as model
+
+    rows = list(model.objects.values_list('id', 'hex_code', 'family'))
+    changed = [
+        model(id=pk, family=family)
+        for (pk, _, old), family in zip(rows, classify([hex_code for _, hex_code, _ in rows]))
+        if family != old
+    ]
+    model.objects.bulk_update(changed, ['family'], batch_size=batch_size)
+    return len(changed)
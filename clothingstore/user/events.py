@@ -0,0 +1,259 @@
+"""
+Buffered shopper events: product views, searches and suggestion lookups.
+
+Views call the `record_*` helpers, which only append a tuple to a bounded
+in-process deque, so the request path does no I/O. A daemon thread drains
+the deque every FLUSH_INTERVAL seconds (sooner once BATCH_SIZE events are
+waiting) and writes them to ShopperEvent with one bulk INSERT per batch.
+
+Each gunicorn worker gets its own buffer and flusher thread: the buffer
+remembers the pid it was created in and starts over after a fork, so a
+preloaded master never hands its deque or thread to the workers. When the
+flusher cannot keep up (or the database is down) the deque discards the
+oldest events once it holds BUFFER_SIZE; this is telemetry, not accounting.
+
+`manage.py rollup_events` (cron) folds the raw rows into ProductViewDaily and
+SearchQueryDaily and deletes them.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+BUFFER_SIZE = 10000
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 5.0
+QUERY_MAX_LENGTH = 100
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query):
+    return ' '.join((query or '').lower().split())[:QUERY_MAX_LENGTH]
+
+
+# -----------------------------------------------------------
+# 1. IN-PROCESS BUFFER
+# -----------------------------------------------------------
+class EventBuffer:
+    def __init__(self, maxlen=BUFFER_SIZE):
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._events = deque(maxlen=self.maxlen)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.dropped = 0
+
+    def push(self, event):
+        if self._pid != os.getpid() or self._thread is None:
+            self._ensure_flusher()
+        if len(self._events) == self.maxlen:
+            self.dropped += 1
+        self._events.append(event)  # deque.append is atomic
+        if len(self._events) >= BATCH_SIZE:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()  # forked: the parent's thread does not exist here
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='shopper-events', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Lost a batch of shopper events")
+            finally:
+                close_old_connections()
+
+    def _drain(self, limit):
+        batch = []
+        try:
+            while len(batch) < limit:
+                batch.append(self._events.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def flush(self):
+        """Writes everything buffered so far; returns the number of events written."""
+        from .models import ShopperEvent
+
+        written = 0
+        while True:
+            batch = self._drain(BATCH_SIZE)
+            if not batch:
+                return written
+            ShopperEvent.objects.bulk_create([
+                ShopperEvent(kind=kind, product_id=product_id, query=query, results=results, created_at=created_at)
+                for kind, product_id, query, results, created_at in batch
+            ])
+            written += len(batch)
+
+    def __len__(self):
+        return len(self._events)
+
+
+buffer = EventBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if buffer._pid == os.getpid() and len(buffer):
+        try:
+            buffer.flush()
+        except Exception:
+            logger.exception("Could not flush shopper events on exit")
+
+
+def _enabled():
+    return getattr(settings, 'SHOPPER_EVENTS_ENABLED', True)
+
+
+def record_product_view(product_id):
+    if _enabled():
+        buffer.push(('view', product_id, '', None, timezone.now()))
+
+
+def record_search(query, results):
+    query = normalize_query(query)
+    if query and _enabled():
+        buffer.push(('search', None, query, results, timezone.now()))
+
+
+def record_suggest(prefix):
+    prefix = normalize_query(prefix)
+    if prefix and _enabled():
+        buffer.push(('suggest', None, prefix, None, timezone.now()))
+
+
+# -----------------------------------------------------------
+# 2. ROLLUPS
+# -----------------------------------------------------------
+ROLLUP_BATCH_SIZE = 10000
+
+
+def _take_events(cutoff):
+    """
+    Deletes the raw rows up to `cutoff` a batch at a time and yields them as
+    (kind, product_id, query, results, created_at). Each row is counted from
+    the DELETE's own RETURNING, so a row is counted exactly when it is
+    removed, even one whose flusher commits while the rollup runs.
+    """
+    from .models import ShopperEvent
+
+    table = ShopperEvent._meta.db_table
+    sql = f"""
+        DELETE FROM {table}
+         WHERE id IN (SELECT id FROM {table} WHERE id <= %s ORDER BY id LIMIT %s)
+        RETURNING kind, product_id, query, results, created_at
+    """
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(sql, [cutoff, ROLLUP_BATCH_SIZE])
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            yield from rows
+
+
+def rollup_events():
+    """
+    Adds every raw event up to the current max id into the daily tables and
+    deletes those rows, in one transaction. Flushers keep appending above the
+    cutoff meanwhile. Run it from a single cron job.
+    """
+    from .models import Product, ProductViewDaily, SearchQueryDaily, ShopperEvent
+
+    with transaction.atomic():
+        cutoff = ShopperEvent.objects.aggregate(last=Max('id'))['last']
+        if cutoff is None:
+            return 0
+
+        deleted = 0
+        views = defaultdict(lambda: [0])                 # (product_id, day) -> [views]
+        queries = defaultdict(lambda: [0, 0])            # (kind, query, day) -> [count, zero results]
+        for kind, product_id, query, results, created_at in _take_events(cutoff):
+            deleted += 1
+            day = timezone.localdate(created_at)
+            if kind == 'view':
+                views[product_id, day][0] += 1
+            else:
+                counts = queries[kind, query, day]
+                counts[0] += 1
+                counts[1] += results == 0
+
+        # Views of products deleted since are dropped.
+        live = set(Product.objects.filter(id__in={pid for pid, _ in views}).values_list('id', flat=True))
+        views = {key: counts for key, counts in views.items() if key[0] in live}
+        existing = ProductViewDaily.objects.filter(
+            product_id__in={pid for pid, _ in views}, day__in={day for _, day in views}
+        )
+        _merge(ProductViewDaily, existing, views, lambda obj: (obj.product_id, obj.day),
+               lambda key, counts: ProductViewDaily(product_id=key[0], day=key[1], views=counts[0]), ['views'])
+
+        queries = dict(queries)
+        existing = SearchQueryDaily.objects.filter(
+            query__in={query for _, query, _ in queries}, day__in={day for _, _, day in queries}
+        )
+        _merge(SearchQueryDaily, existing, queries, lambda obj: (obj.kind, obj.query, obj.day),
+               lambda key, counts: SearchQueryDaily(kind=key[0], query=key[1], day=key[2],
+                                                    count=counts[0], zero_results=counts[1]),
+               ['count', 'zero_results'])
+    return deleted
+
+
+def _merge(model, existing, increments, key_of, build, fields):
+    """Adds increments ({key: (value per field)}) onto existing rows, creating the rest."""
+    to_update = []
+    for obj in existing:
+        increment = increments.pop(key_of(obj), None)
+        if increment is None:
+            continue
+        for field, value in zip(fields, increment):
+            setattr(obj, field, getattr(obj, field) + value)
+        to_update.append(obj)
+    model.objects.bulk_update(to_update, fields, batch_size=1000)
+    model.objects.bulk_create([build(key, value) for key, value in increments.items()], batch_size=1000)
+
+
+# -----------------------------------------------------------
+# 3. REPORTS
+# -----------------------------------------------------------
+def top_queries(days=7, kind='search', limit=20):
+    """[(query, count, zero_result_count), ...] over the last `days` days."""
+    from .models import SearchQueryDaily
+
+    since = timezone.localdate() - timedelta(days=days)
+    rows = (
+        SearchQueryDaily.objects.filter(kind=kind, day__gte=since)
+        .values('query').annotate(total=Sum('count'), zero=Sum('zero_results'))
+        .order_by('-total')[:limit]
+    )
+    return [(row['query'], row['total'], row['zero']) for row in rows]
+
+
+def product_view_counts(days=30):
+    """{product_id: views} over the last `days` days."""
+    from .models import ProductViewDaily
+
+    since = timezone.localdate() - timedelta(days=days)
+    rows = ProductViewDaily.objects.filter(day__gte=since).values('product_id').annotate(total=Sum('views'))
+    return {row['product_id']: row['total'] for row in rows}
@@ -0,0 +1,310 @@
+"""
+Responsive image derivatives.
+
+Every uploaded image in IMAGE_FIELDS is re-encoded at DERIVATIVE_WIDTHS in
+each supported modern format (AVIF when Pillow has it, always WebP) next to
+the original:
+
+    products/primary/black-tee.jpg
+    -> derivatives/products/primary/black-tee-320w.webp, ...-640w.avif, ...
+
+Images narrower than a width are stored at their own size under that width's
+name, so a srcset never points at a missing file. What was generated is
+recorded on the instance in `image_derivatives`:
+
+    {'primary_image': {'name': 'products/primary/black-tee.jpg',
+                       'widths': [320, 640, 960, 1280], 'formats': ['avif', 'webp']}}
+
+and templates build srcset from that record alone (see templatetags/image_tags.py),
+falling back to the original when the file changed since. The record also
+carries the intrinsic size and a tiny inline preview (LQIP), so a grid can
+reserve layout space and paint a blurred placeholder before the image loads:
+
+    {..., 'width': 1200, 'height': 1600, 'placeholder': 'data:image/webp;base64,...'}
+
+Encoding a dozen derivatives takes seconds, so it never runs in a request.
+On upload the post_save handlers in user/signals.py only record the size and
+preview (decoded from a reduced JPEG draft) once the transaction commits.
+`manage.py generate_image_derivatives`, run from cron, encodes whatever has
+no derivatives yet in a process pool; until it has, templates serve the
+original. `manage.py generate_placeholders` backfills only the sizes and
+previews.
+"""
+import base64
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps, features
+
+DERIVATIVE_WIDTHS = tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 960, 1280)))
+DERIVATIVE_ROOT = 'derivatives'
+QUALITY = {'avif': 55, 'webp': 80}
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+PLACEHOLDER_SIZE = 16   # px on the long edge; ~150 bytes inlined per image
+ORIENTATION = 0x0112    # EXIF tag
+
+# model label -> image fields with derivatives
+IMAGE_FIELDS = {
+    'user.Product': ('primary_image', 'hover_image'),
+    'user.ProductImage': ('image',),
+    'user.Category': ('image',),
+    'owner.Blog': ('thumbnail', 'main_image', 'image_1', 'image_2', 'image_3', 'image_4', 'image_5'),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def derivative_formats():
+    """Best first; <source> order in a <picture> follows it."""
+    return [fmt for fmt in ('avif', 'webp') if features.check(fmt)]
+
+
+def derivative_name(name, width, fmt):
+    root, _ = os.path.splitext(name)
+    return f"{DERIVATIVE_ROOT}/{root}-{width}w.{fmt}"
+
+
+# -----------------------------------------------------------
+# 1. ENCODING
+# -----------------------------------------------------------
+def _open(name):
+    with default_storage.open(name, 'rb') as fh:
+        image = ImageOps.exif_transpose(Image.open(fh))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    return image
+
+
+def describe(image, size=None):
+    """Intrinsic size (default: the image's own) and a PLACEHOLDER_SIZE preview as a data: URI."""
+    width, height = size or image.size
+    small = image.copy()
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    if small.mode == 'RGBA':
+        # Cards sit on white; flatten so transparent areas don't preview black.
+        flat = Image.new('RGB', small.size, 'white')
+        flat.paste(small, mask=small.getchannel('A'))
+        small = flat
+    buffer = io.BytesIO()
+    small.save(buffer, 'WEBP', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return {'width': width, 'height': height, 'placeholder': f"data:image/webp;base64,{encoded}"}
+
+
+def generate_placeholder(name):
+    """
+    The size/preview part of a record only (no derivatives written). JPEGs
+    are decoded at a fraction of their size, so this is cheap enough to run
+    right after an upload.
+    """
+    with default_storage.open(name, 'rb') as fh:
+        image = Image.open(fh)
+        width, height = image.size
+        if image.getexif().get(ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width   # exif_transpose turns these by 90 degrees
+        image.draft('RGB', (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    return {'name': name, **describe(image, (width, height))}
+
+
+def generate_derivatives(name, widths=DERIVATIVE_WIDTHS, formats=None):
+    """
+    Writes every (width, format) derivative of the stored file `name` and
+    returns the record kept in `image_derivatives`. Touches only storage, so
+    it can run in a worker process.
+    """
+    formats = formats or derivative_formats()
+    original = _open(name)
+
+    for width in widths:
+        if original.width > width:
+            image = original.resize((width, round(original.height * width / original.width)), Image.LANCZOS)
+        else:
+            image = original
+        for fmt in formats:
+            buffer = io.BytesIO()
+            image.save(buffer, fmt.upper(), quality=QUALITY[fmt])
+            target = derivative_name(name, width, fmt)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+    return {'name': name, 'widths': list(widths), 'formats': list(formats), **describe(original)}
+
+
+def delete_derivatives(record):
+    for width in record.get('widths', ()):
+        for fmt in record.get('formats', ()):
+            target = derivative_name(record['name'], width, fmt)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+
+
+# -----------------------------------------------------------
+# 2. MODEL INSTANCES
+# -----------------------------------------------------------
+def stale_fields(instance, key='formats'):
+    """
+    {field: file name} for image fields whose record is missing, out of date,
+    or lacks `key` ('formats': derivatives, 'placeholder': size and preview).
+    """
+    fields = IMAGE_FIELDS.get(instance._meta.label, ())
+    recorded = instance.image_derivatives or {}
+    stale = {}
+    for field in fields:
+        file = getattr(instance, field)
+        record = recorded.get(field, {})
+        if file and (record.get('name') != file.name or key not in record):
+            stale[field] = file.name
+    return stale
+
+
+def dropped_fields(instance):
+    """Image fields that were cleared but still have derivatives recorded."""
+    recorded = instance.image_derivatives or {}
+    return [f for f in IMAGE_FIELDS.get(instance._meta.label, ()) if f in recorded and not getattr(instance, f)]
+
+
+def needs_processing(instance):
+    """Whether the cheap post-upload step has work: a preview to record or derivatives to drop."""
+    return bool(stale_fields(instance, 'placeholder') or dropped_fields(instance))
+
+
+def _store_records(model, pk, records, dropped=()):
+    """
+    Merges records into image_derivatives with an UPDATE (no save(), no
+    signals). A record for the same file extends the stored one.
+    """
+    instance = model.objects.only('image_derivatives').get(pk=pk)
+    merged = dict(instance.image_derivatives or {})
+    for field in dropped:
+        merged.pop(field, None)
+    for field, record in records.items():
+        if merged.get(field, {}).get('name') == record['name']:
+            record = {**merged[field], **record}
+        merged[field] = record
+    model.objects.filter(pk=pk).update(image_derivatives=merged)
+
+
+def process_instance(instance):
+    """
+    The post-upload step for one saved instance: records the size and
+    preview of new files and deletes the derivatives of cleared ones.
+    Derivatives are left to `backfill`. Returns the fields processed.
+    """
+    dropped = dropped_fields(instance)
+    for field in dropped:
+        delete_derivatives(instance.image_derivatives[field])
+
+    records = {}
+    for field, name in stale_fields(instance, 'placeholder').items():
+        try:
+            records[field] = generate_placeholder(name)
+        except Exception:
+            logger.exception("Could not generate a placeholder for %s", name)
+    if records or dropped:
+        _store_records(type(instance), instance.pk, records, dropped)
+    return list(records)
+
+
+def backfill(labels=None, workers=None, force=False, stdout=None, placeholders=False):
+    """
+    Generates derivatives (or with `placeholders`, only the size and preview)
+    for every stored image of the given models (default: all of
+    IMAGE_FIELDS), encoding in a process pool. Returns the number of images
+    processed.
+    """
+    generate, key = (generate_placeholder, 'placeholder') if placeholders else (generate_derivatives, 'formats')
+    jobs = []   # (model, pk, field, name)
+    for label in labels or IMAGE_FIELDS:
+        model = apps.get_model(label)
+        fields = IMAGE_FIELDS[label]
+        for instance in model.objects.only('image_derivatives', *fields).iterator():
+            if force:
+                todo = {f: getattr(instance, f).name for f in fields if getattr(instance, f)}
+            else:
+                todo = stale_fields(instance, key)
+            jobs.extend((model, instance.pk, field, name) for field, name in todo.items())
+    if not jobs:
+        return 0
+
+    # Workers only touch storage; don't let them inherit our DB connections.
+    connections.close_all()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(generate, name) for _, _, _, name in jobs]
+        for (model, pk, field, name), future in zip(jobs, futures):
+            try:
+                record = future.result()
+            except Exception:
+                logger.exception("Could not generate derivatives for %s", name)
+                continue
+            _store_records(model, pk, {field: record})
+            done += 1
+            if stdout and done % 100 == 0:
+                stdout.write(f"  {done}/{len(jobs)} images")
+    return done
+
+
+# -----------------------------------------------------------
+# 3. URLS FOR TEMPLATES AND ADMIN
+# -----------------------------------------------------------
+def _record(instance, field):
+    file = getattr(instance, field, None)
+    if not file:
+        return None
+    record = (getattr(instance, 'image_derivatives', None) or {}).get(field)
+    if not record or record.get('name') != file.name:
+        return None
+    return record
+
+
+def srcset(instance, field, fmt):
+    """'url 320w, url 640w, ...' for one format, or '' when not generated."""
+    record = _record(instance, field)
+    if not record or fmt not in record.get('formats', ()):
+        return ''
+    return ', '.join(
+        f"{default_storage.url(derivative_name(record['name'], width, fmt))} {width}w"
+        for width in record['widths']
+    )
+
+
+def sources(instance, field):
+    """[(mime type, srcset), ...] best format first."""
+    record = _record(instance, field)
+    if not record:
+        return []
+    return [(MIME_TYPES[fmt], srcset(instance, field, fmt)) for fmt in record.get('formats', ()) if fmt in MIME_TYPES]
+
+
+def thumbnail_url(instance, field):
+    """Smallest WebP derivative (admin previews), else the original."""
+    record = _record(instance, field)
+    if record and 'webp' in record.get('formats', ()):
+        return default_storage.url(derivative_name(record['name'], min(record['widths']), 'webp'))
+    file = getattr(instance, field, None)
+    return file.url if file else ''
+
+
+def dimensions(instance, field):
+    """(width, height) of the original, or None."""
+    record = _record(instance, field)
+    if record and 'width' in record:
+        return record['width'], record['height']
+    return None
+
+
+def placeholder(instance, field):
+    record = _record(instance, field)
+    return record.get('placeholder', '') if record else ''
@@ -0,0 +1,62 @@
+import tracemalloc
+import time
+
+from django.db import transaction
+
+from user.management.commands.benchmark_search import COLORS, Command as SearchBenchmark, _Rollback
+from user.models import Product, ProductColor
+from user.pagination import PAGE_SIZE
+
+HEX = {"Black": "#000000", "White": "#FFFFFF", "Grey": "#808080", "Beige": "#F5F5DC", "Blue": "#1F3A93",
+       "Green": "#2E7D32", "Red": "#C62828", "Yellow": "#F9A825", "Brown": "#6D4C41", "Orange": "#EF6C00"}
+
+
+class Command(SearchBenchmark):
+    help = ("Compares full Product rows with Product.objects.cards() for a grid page and a whole-catalog "
+            "scan, on a synthetic catalog (rolled back afterwards).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000,
+                            help="Synthetic catalog size; below ~10k the projection's savings are understated.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options['products'])
+                self._seed_colors()
+                self.stdout.write(f"{'case':<22}{'full ms':>10}{'cards ms':>10}{'full KiB':>11}{'cards KiB':>11}")
+                cases = [
+                    ('grid page', lambda qs: list(qs.order_by('-id')[:PAGE_SIZE])),
+                    ('whole catalog', lambda qs: list(qs.order_by('id'))),
+                ]
+                for name, load in cases:
+                    full_ms, _ = self._time(lambda: load(Product.objects.all()), options['repeat'])
+                    cards_ms, _ = self._time(lambda: load(Product.objects.cards()), options['repeat'])
+                    full_kib = self._peak_kib(lambda: load(Product.objects.all()))
+                    cards_kib = self._peak_kib(lambda: load(Product.objects.cards()))
+                    self.stdout.write(f"{name:<22}{full_ms:>10.2f}{cards_ms:>10.2f}{full_kib:>11.0f}{cards_kib:>11.0f}")
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write(self.style.SUCCESS("Synthetic catalog rolled back."))
+
+    def _seed_colors(self):
+        started = time.perf_counter()
+        colors = []
+        for product in Product.objects.filter(slug__startswith='bench-').only('id', 'name'):
+            name = product.name.split()[1]
+            colors.append(ProductColor(product=product, name=name, slug=name.lower(), hex_code=HEX.get(name, '#000000'),
+                                       is_primary=True, stock=product.id % 7))
+            other = COLORS[(COLORS.index(name) + 1) % len(COLORS)] if name in COLORS else 'Black'
+            colors.append(ProductColor(product=product, name=other, slug=other.lower(), hex_code=HEX[other], stock=0))
+        ProductColor.objects.bulk_create(colors, batch_size=5000)
+        Product.objects.filter(slug__startswith='bench-').refresh_stock()
+        self.stdout.write(f"Seeded {len(colors)} colors in {time.perf_counter() - started:.1f}s")
+
+    def _peak_kib(self, fn):
+        tracemalloc.start()
+        try:
+            fn()
+            return tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
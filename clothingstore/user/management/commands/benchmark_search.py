@@ -0,0 +1,114 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from user.models import Category, Product
+from user.search import is_full_text_enabled, search_products, update_search_vectors
+
+ADJECTIVES = ["Oversized", "Slim", "Regular", "Relaxed", "Cropped", "Premium", "Classic", "Washed", "Printed", "Plain"]
+GARMENTS = ["Tshirt", "Hoodie", "Jeans", "Shirt", "Trousers", "Shorts", "Jacket", "Polo", "Sweatshirt", "Joggers"]
+COLORS = ["Black", "White", "Grey", "Beige", "Blue", "Green", "Red", "Yellow", "Brown", "Orange"]
+FABRICS = ["cotton", "denim", "linen", "fleece", "polyester", "rayon", "twill", "jersey"]
+FILLER = (
+    "Made for wholesale buyers, this piece ships in assorted size packs. "
+    "Pre-shrunk, colour-fast and finished with reinforced seams for everyday wear. "
+)
+
+DEFAULT_QUERIES = ["oversized", "black hoodie", "denim jeans", "cotton", "premium polo", "fleece joggers"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmarks full-text search against the legacy icontains search on a synthetic catalog (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--query', action='append', dest='queries')
+
+    def handle(self, *args, **options):
+        if not is_full_text_enabled():
+            raise CommandError("Full-text search needs PostgreSQL (current backend: %s)." % connection.vendor)
+
+        queries = options['queries'] or DEFAULT_QUERIES
+        try:
+            with transaction.atomic():
+                self._seed(options['products'])
+                self.stdout.write(f"{'query':<18}{'legacy ms':>12}{'fts ms':>10}{'hits':>8}")
+                for query in queries:
+                    legacy_ms, legacy_hits = self._time(lambda: self._legacy(query), options['repeat'])
+                    fts_ms, fts_hits = self._time(lambda: self._fts(query), options['repeat'])
+                    self.stdout.write(f"{query:<18}{legacy_ms:>12.2f}{fts_ms:>10.2f}{fts_hits:>8}  (legacy hits {legacy_hits})")
+                raise _Rollback
+        except _Rollback:
+            self.stdout.write(self.style.SUCCESS("Synthetic catalog rolled back."))
+
+    def _seed(self, count):
+        rng = random.Random(42)
+        started = time.perf_counter()
+        categories = [Category(name=f"bench-{g}", slug=f"bench-{g.lower()}", image='categories/bench.jpg') for g in GARMENTS]
+        Category.objects.bulk_create(categories)
+
+        products = []
+        for i in range(count):
+            adjective, garment, color = rng.choice(ADJECTIVES), rng.choice(GARMENTS), rng.choice(COLORS)
+            fabric = rng.choice(FABRICS)
+            body = f"{adjective} {color.lower()} {garment.lower()} in {fabric}. " + FILLER * rng.randint(2, 6)
+            products.append(Product(
+                name=f"{adjective} {color} {garment} {i}",
+                slug=f"bench-{i}",
+                price=Decimal(rng.randint(300, 3000)),
+                sizes="1S, 2M, 1L",
+                total_pieces=4,
+                primary_image='products/primary/bench.jpg',
+                description=body,
+                html_description=f"<p><strong>{fabric.title()}</strong> {body}</p>",
+            ))
+            products[-1].update_stored_prices()
+        Product.objects.bulk_create(products, batch_size=2000)
+
+        by_name = {c.name.split('-', 1)[1]: c.id for c in categories}
+        Through = Product.categories.through
+        Through.objects.bulk_create(
+            [Through(product_id=p.id, category_id=by_name[p.name.split()[2]]) for p in products],
+            batch_size=5000,
+        )
+        update_search_vectors([p.id for p in products])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE user_product")
+        self.stdout.write(f"Seeded {count} products in {time.perf_counter() - started:.1f}s")
+
+    def _legacy(self, query):
+        base_filter = (
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(html_description__icontains=query)
+        )
+        matched_categories = Category.objects.filter(name__icontains=query)
+        if matched_categories.exists():
+            base_filter |= Q(categories__in=matched_categories)
+        products = Product.objects.filter(base_filter).distinct().order_by('-id')
+        list(products[:48])
+        return products.count()
+
+    def _fts(self, query):
+        products = search_products(Product.objects.all(), query).order_by('-rank', '-id')
+        list(products[:48])
+        return products.count()
+
+    def _time(self, fn, repeat):
+        timings = []
+        hits = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            hits = fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), hits
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from user.catalog_cache import bump_catalog_version
+from user.color_families import classify_all
+
+
+class Command(BaseCommand):
+    help = "Re-assigns every ProductColor's color family from its hex code (after editing the prototypes)."
+
+    def handle(self, *args, **options):
+        changed = classify_all()
+        # The color facet in the index and cached listings follow the families.
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Re-classified {changed} colors."))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.attributes import extract_all
+from user.catalog_cache import bump_catalog_version
+
+
+class Command(BaseCommand):
+    help = "Re-extracts sleeve/fabric/fit/neckline attributes from every product's text (after editing the keywords)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        products, rows = extract_all(batch_size=options['batch_size'], stdout=self.stdout)
+        # The facet index and cached listings are rebuilt from the new rows.
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Extracted {rows} attributes from {products} products in {time.perf_counter() - started:.2f}s."
+        ))
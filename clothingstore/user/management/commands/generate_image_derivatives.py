@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from user.catalog_cache import bump_catalog_version
+from user.images import IMAGE_FIELDS, backfill
+
+
+class Command(BaseCommand):
+    help = ("Generates responsive WebP/AVIF derivatives for images that have none yet, encoding in a process pool "
+            "(run from cron: uploads are not encoded in the request).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=list(IMAGE_FIELDS), dest='models',
+                            help="Only this model (repeatable); default: every model with images.")
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+        parser.add_argument('--force', action='store_true', help="Regenerate even up-to-date derivatives.")
+
+    def handle(self, *args, **options):
+        done = backfill(options['models'], workers=options['workers'], force=options['force'], stdout=self.stdout)
+        if done:
+            # Cached listings and fragments embed the srcset of each card.
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Generated derivatives for {done} images."))
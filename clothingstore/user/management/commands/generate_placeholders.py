@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from user.catalog_cache import bump_catalog_version
+from user.images import IMAGE_FIELDS, backfill
+
+
+class Command(BaseCommand):
+    help = ("Computes the intrinsic size and inline blurred preview of existing images (no derivatives), "
+            "decoding in a process pool.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=list(IMAGE_FIELDS), dest='models',
+                            help="Only this model (repeatable); default: every model with images.")
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+        parser.add_argument('--force', action='store_true', help="Recompute even existing previews.")
+
+    def handle(self, *args, **options):
+        done = backfill(options['models'], workers=options['workers'], force=options['force'],
+                        stdout=self.stdout, placeholders=True)
+        # Cached cards embed the previews.
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Computed placeholders for {done} images."))
@@ -0,0 +1,90 @@
+import os
+
+from django.apps import apps
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models import FileField
+
+from user.catalog_cache import bump_catalog_version
+from user.images import backfill, delete_derivatives
+from user.storage import ContentAddressedStorage, is_hashed, media_storage
+
+
+class Command(BaseCommand):
+    help = ("Moves existing media of content-addressed fields to hashed names (deduplicating identical files) "
+            "and rewrites every stored reference, including order/cart snapshots.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be renamed.")
+        parser.add_argument('--delete-originals', action='store_true',
+                            help="Delete the old files and their derivatives once nothing references them. "
+                                 "Keep them if rich-text content may embed the old URLs.")
+        parser.add_argument('--workers', type=int, default=None, help="Derivative worker processes.")
+
+    def handle(self, *args, **options):
+        renamed = {}    # old name -> new name
+        missing = 0
+        for model, fields in self._hashed_fields():
+            queryset = model.objects.all()
+            if model._meta.label == 'user.ProductImage':
+                queryset = queryset.select_related('color__product')    # get_variant_image_path
+            for instance in queryset.order_by('pk').iterator(chunk_size=500):
+                changes = {}
+                for field in fields:
+                    file = getattr(instance, field.name)
+                    if not file or is_hashed(file.name):
+                        continue
+                    if file.name in renamed:
+                        changes[field.name] = renamed[file.name]
+                        continue
+                    if not field.storage.exists(file.name):
+                        missing += 1
+                        self.stderr.write(f"  missing: {file.name}")
+                        continue
+                    if options['dry_run']:
+                        renamed[file.name] = file.name
+                        continue
+                    upload_name = field.generate_filename(instance, os.path.basename(file.name))
+                    with field.storage.open(file.name, 'rb') as fh:
+                        renamed[file.name] = changes[field.name] = field.storage.save(upload_name, File(fh))
+                    if options['delete_originals']:
+                        delete_derivatives((getattr(instance, 'image_derivatives', None) or {}).get(field.name, {}))
+                if changes and not options['dry_run']:
+                    model.objects.filter(pk=instance.pk).update(**changes)
+
+        if options['dry_run']:
+            self.stdout.write(f"Would rehash {len(renamed)} files ({missing} missing).")
+            return
+
+        snapshots = self._rewrite_references(renamed)
+        if options['delete_originals']:
+            for old in renamed:
+                media_storage().delete(old)
+
+        # The new names have no derivatives yet.
+        generated = backfill(workers=options['workers'], stdout=self.stdout)
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rehashed {len(renamed)} files into {len(set(renamed.values()))} names ({missing} missing), "
+            f"rewrote {snapshots} snapshot references, generated derivatives for {generated} images."
+        ))
+
+    def _hashed_fields(self):
+        for model in apps.get_models():
+            fields = [f for f in model._meta.concrete_fields
+                      if isinstance(f, FileField) and isinstance(f.storage, ContentAddressedStorage)]
+            if fields:
+                yield model, fields
+
+    def _rewrite_references(self, renamed):
+        """Other file fields (cart/order snapshots) that store the same names."""
+        rewritten = 0
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, FileField) or isinstance(field.storage, ContentAddressedStorage):
+                    continue
+                names = set(model.objects.filter(**{f'{field.name}__in': list(renamed)})
+                            .values_list(field.name, flat=True).distinct())
+                for old in names:
+                    rewritten += model.objects.filter(**{field.name: old}).update(**{field.name: renamed[old]})
+        return rewritten
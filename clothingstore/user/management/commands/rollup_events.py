@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from user.events import rollup_events, top_queries
+
+
+class Command(BaseCommand):
+    help = "Folds buffered shopper events into the daily view/search tables (run from a single cron job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', action='store_true', help="Print the top searches of the last 7 days.")
+
+    def handle(self, *args, **options):
+        rolled = rollup_events()
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {rolled} events."))
+        if options['report']:
+            for query, count, zero in top_queries():
+                self.stdout.write(f"{count:>8}  {query}" + (f"  ({zero} with no results)" if zero else ""))
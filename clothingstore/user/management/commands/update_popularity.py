@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from user.catalog_cache import bump_popularity_version
+from user.popularity import HALF_LIFE_DAYS, update_popularity
+
+
+class Command(BaseCommand):
+    help = "Recomputes time-decayed sales popularity for products and categories (run from cron)."
+
+    def handle(self, *args, **options):
+        products, categories = update_popularity()
+        # Only the entries ordered by popularity carry this version.
+        bump_popularity_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {products} products and {categories} categories (half-life {HALF_LIFE_DAYS} days)."
+        ))
@@ -0,0 +1,77 @@
+"""
+Signed, expiring URLs for course media.
+
+course_detail checks CourseEnrollment once and issues one URL per
+CourseVideo / CoursePDF. A player then fires many Range requests at that
+URL, and each is authorized by the signature alone: no enrollment query, no
+session or user lookup.
+
+A token is `django.core.signing` data (HMAC-SHA256 under SECRET_KEY):
+
+    {'k': 'video', 'n': 'courses/videos/intro.mp4', 'u': user id, 'e': expiry}
+
+signed with a salt that includes the browser's session cookie. The cookie is
+read from the request, never loaded from the session store. A URL copied to
+someone else fails verification without that session, and every URL stops
+working after COURSE_MEDIA_TOKEN_TTL seconds. Reloading the course page
+issues fresh ones.
+"""
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+
+TOKEN_TTL = getattr(settings, 'COURSE_MEDIA_TOKEN_TTL', 2 * 60 * 60)
+SALT = 'user.media_tokens'
+
+# kind -> (model label, file field, content type, download as attachment)
+MEDIA_KINDS = {
+    'video': ('user.CourseVideo', 'video_file', 'video/mp4', False),
+    'pdf': ('user.CoursePDF', 'file', 'application/pdf', True),
+}
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _salt(session_key):
+    return f"{SALT}:{session_key or ''}"
+
+
+def _session_cookie(request):
+    return request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+
+
+def issue(request, kind, field_file, filename=None, ttl=None):
+    """Token for `field_file`, valid for this user and session until now + ttl."""
+    # The cookie the browser will send back; a session created by this very
+    # request (no cookie yet) gets its key in the response.
+    session_key = _session_cookie(request) or request.session.session_key
+    payload = {
+        'k': kind,
+        'n': field_file.name,
+        'u': request.user.pk,
+        'e': int(time.time()) + (TOKEN_TTL if ttl is None else ttl),
+    }
+    if filename:
+        payload['f'] = filename
+    return signing.dumps(payload, salt=_salt(session_key), compress=True)
+
+
+def signed_url(request, kind, field_file, filename=None):
+    return reverse('signed_media', args=[issue(request, kind, field_file, filename)])
+
+
+def verify(request, token):
+    """The token's payload, or InvalidToken. Touches neither the database nor the session store."""
+    try:
+        payload = signing.loads(token, salt=_salt(_session_cookie(request)))
+    except signing.BadSignature:
+        raise InvalidToken("Bad signature (or another session's URL).")
+    if payload.get('k') not in MEDIA_KINDS or not payload.get('n'):
+        raise InvalidToken("Malformed token.")
+    if payload.get('e', 0) < time.time():
+        raise InvalidToken("Expired.")
+    return payload
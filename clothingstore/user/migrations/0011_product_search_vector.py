@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:27
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def backfill_search_vectors(apps, schema_editor):
+    from user.search import update_search_vectors
+
+    update_search_vectors(models=(apps.get_model('user', 'Product'), apps.get_model('user', 'Category')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_category_image_alt_product_hover_image_alt_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='alt_text',
+            field=models.CharField(blank=True, help_text='SEO alt text for variant image', max_length=160),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+        ),
+        migrations.RunPython(backfill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+def backfill_stored_prices(apps, schema_editor):
+    from user.models import parse_pack_composition, stored_prices
+
+    Product = apps.get_model('user', 'Product')
+    products = list(Product.objects.only('price', 'discount_price', 'sizes'))
+    for product in products:
+        product.effective_price, product.price_per_piece = stored_prices(
+            product.price, product.discount_price, sum(parse_pack_composition(product.sizes).values())
+        )
+    Product.objects.bulk_update(products, ['effective_price', 'price_per_piece'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0011_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Discount price if set, else price.', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='price_per_piece',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='effective_price divided by the pieces in the set.', max_digits=10),
+        ),
+        migrations.RunPython(backfill_stored_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['effective_price', 'id'], name='product_effective_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price_per_piece', 'id'], name='product_price_per_piece_idx'),
+        ),
+    ]
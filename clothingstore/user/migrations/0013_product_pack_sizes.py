@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_pack_sizes(apps, schema_editor):
+    from user.models import parse_pack_composition
+
+    Product = apps.get_model('user', 'Product')
+    ProductPackSize = apps.get_model('user', 'ProductPackSize')
+    products = list(Product.objects.only('sizes'))
+    rows = []
+    for product in products:
+        composition = parse_pack_composition(product.sizes)
+        product.total_pieces = sum(composition.values())
+        rows.extend(ProductPackSize(product=product, size=size, pieces=pieces) for size, pieces in composition.items())
+    Product.objects.bulk_update(products, ['total_pieces'], batch_size=500)
+    ProductPackSize.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0012_product_stored_prices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='total_pieces',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProductPackSize',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(help_text="Size token, e.g. 'M' or '32'.", max_length=3)),
+                ('pieces', models.PositiveSmallIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pack_sizes', to='user.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['size', 'product'], name='pack_size_product_idx')],
+                'unique_together': {('product', 'size')},
+            },
+        ),
+        migrations.RunPython(backfill_pack_sizes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0015_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopperEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('view', 'Product view'), ('search', 'Search'), ('suggest', 'Suggestion lookup')], max_length=10)),
+                ('product_id', models.IntegerField(blank=True, null=True)),
+                ('query', models.CharField(blank=True, max_length=100)),
+                ('results', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchQueryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('view', 'Product view'), ('search', 'Search'), ('suggest', 'Suggestion lookup')], max_length=10)),
+                ('query', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('zero_results', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'kind'], name='search_query_day_idx')],
+                'unique_together': {('kind', 'query', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='user.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'product'], name='product_view_day_idx')],
+                'unique_together': {('product', 'day')},
+            },
+        ),
+    ]
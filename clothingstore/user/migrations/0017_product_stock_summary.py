@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef
+
+
+def backfill_stock_summary(apps, schema_editor):
+    from user.models import stock_summary
+
+    Product = apps.get_model('user', 'Product')
+    ProductColor = apps.get_model('user', 'ProductColor')
+    Product.objects.update(**stock_summary(ProductColor.objects.filter(product=OuterRef('pk'))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0016_shopper_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='has_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_color',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='user.productcolor'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='total_stock',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Sets in stock over all colors.'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('has_stock', True)), fields=['-id'], name='product_in_stock_idx'),
+        ),
+        migrations.RunPython(backfill_stock_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_attributes(apps, schema_editor):
+    from user.attributes import extract_attributes
+
+    Product = apps.get_model('user', 'Product')
+    ProductAttribute = apps.get_model('user', 'ProductAttribute')
+    rows = []
+    for product in Product.objects.only('name', 'description', 'html_description').iterator():
+        found = extract_attributes(product.name, product.description, product.html_description)
+        rows.extend(ProductAttribute(product=product, name=name, value=value) for name, value in sorted(found))
+    ProductAttribute.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0017_product_stock_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('sleeve', 'Sleeve'), ('fabric', 'Fabric'), ('fit', 'Fit'), ('neckline', 'Neckline')], max_length=20)),
+                ('value', models.CharField(max_length=40)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attributes', to='user.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'value', 'product'], name='product_attribute_value_idx')],
+                'unique_together': {('product', 'name', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_attributes, migrations.RunPython.noop),
+    ]
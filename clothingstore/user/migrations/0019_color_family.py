@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+def backfill_families(apps, schema_editor):
+    from user.color_families import classify_all
+
+    classify_all(apps.get_model('user', 'ProductColor'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0018_product_attributes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productcolor',
+            name='family',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_families, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:01
+
+import user.models
+import user.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0021_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(max_length=255, storage=user.storage.media_storage, upload_to=user.models.get_category_upload_path),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='banner',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='courses/banners/'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='thumbnail',
+            field=models.ImageField(max_length=255, storage=user.storage.media_storage, upload_to='courses/thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='coursevideo',
+            name='thumbnail',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='courses/videos/thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='hover_image',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to=user.models.get_product_hover_path),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='primary_image',
+            field=models.ImageField(max_length=255, storage=user.storage.media_storage, upload_to=user.models.get_product_primary_path),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='size_chart',
+            field=models.ImageField(blank=True, max_length=255, null=True, storage=user.storage.media_storage, upload_to='products/size_charts/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(max_length=255, storage=user.storage.media_storage, upload_to=user.models.get_variant_image_path),
+        ),
+    ]
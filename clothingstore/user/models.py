@@ -2,13 +2,20 @@ import os
 import re
 import random
 from datetime import timedelta
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 from django.conf import settings
 from ckeditor.fields import RichTextField
-from django.db.models import CheckConstraint, Q
+from django.db.models import CheckConstraint, Exists, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
+from .attributes import ATTRIBUTES, product_attributes
+from .color_families import color_family
+from .storage import media_storage
 
 # -----------------------------------------------------------
 # 1. SEO HELPERS: Dynamic Path & Filenaming
@@ -40,7 +47,7 @@ def get_variant_image_path(instance, filename):
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(unique=True, blank=True)
-    image = models.ImageField(upload_to=get_category_upload_path)
+    image = models.ImageField(upload_to=get_category_upload_path, storage=media_storage, max_length=255)
     
     # SEO Field
     image_alt = models.CharField(
@@ -49,6 +56,11 @@ class Category(models.Model):
         help_text="SEO text for category image (e.g., 'Summer Collection T-Shirts')"
     )
 
+    # Time-decayed sales score (user/popularity.py)
+    popularity = models.FloatField(default=0, editable=False, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)  # sitemap lastmod
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # user/images.py
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
@@ -60,6 +72,36 @@ class Category(models.Model):
 # -----------------------------------------------------------
 # 3. PRODUCT MODEL
 # -----------------------------------------------------------
+# Columns a product card renders, plus every keyset sort key in user/pagination.py.
+# Leaves out description/html_description, by far the largest columns.
+CARD_FIELDS = (
+    'id', 'name', 'slug', 'primary_image', 'primary_image_alt', 'hover_image', 'hover_image_alt',
+    'price', 'discount_price', 'total_pieces', 'effective_price', 'price_per_piece',
+    'created_at', 'popularity', 'rating', 'reviews_count', 'total_stock', 'has_stock', 'image_derivatives',
+    'primary_color', 'primary_color__name', 'primary_color__slug', 'primary_color__hex_code',
+)
+
+
+class ProductQuerySet(models.QuerySet):
+    def cards(self):
+        """
+        Products for grids, search and sitemaps: only CARD_FIELDS, with the
+        primary color joined in the same query.
+        """
+        return self.select_related('primary_color').only(*CARD_FIELDS)
+
+    def in_stock(self):
+        return self.filter(has_stock=True)
+
+    def refresh_stock(self):
+        """
+        Recomputes total_stock, has_stock and primary_color from the colors in
+        one UPDATE. Call it inside the transaction that changed the stock.
+        """
+        colors = ProductColor.objects.filter(product=OuterRef('pk'))
+        return self.update(**stock_summary(colors))
+
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
@@ -72,13 +114,14 @@ class Product(models.Model):
     sizes = models.CharField(max_length=255, help_text="Composition: e.g., '1S, 2M, 1L'.")
     
     # SEO Image Fields
-    primary_image = models.ImageField(upload_to=get_product_primary_path)
+    primary_image = models.ImageField(upload_to=get_product_primary_path, storage=media_storage, max_length=255)
     primary_image_alt = models.CharField(max_length=160, blank=True, help_text="SEO alt text for main image")
     
-    hover_image = models.ImageField(upload_to=get_product_hover_path, null=True, blank=True)
+    hover_image = models.ImageField(upload_to=get_product_hover_path, storage=media_storage, max_length=255, null=True, blank=True)
     hover_image_alt = models.CharField(max_length=160, blank=True, help_text="SEO alt text for hover image")
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # user/images.py
     
-    size_chart = models.ImageField(upload_to='products/size_charts/', null=True, blank=True)
+    size_chart = models.ImageField(upload_to='products/size_charts/', storage=media_storage, max_length=255, null=True, blank=True)
     
     # Shipping Details
     weight = models.FloatField(default=0.5)
@@ -92,23 +135,88 @@ class Product(models.Model):
     description = models.TextField()
     html_description = RichTextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # sitemap lastmod
+
+    # Pack composition parsed from `sizes` on save (see ProductPackSize)
+    total_pieces = models.PositiveIntegerField(default=0, editable=False)
+
+    # Time-decayed sales score, refreshed by `manage.py update_popularity`
+    popularity = models.FloatField(default=0, editable=False)
+
+    # Listing prices, kept in sync by save() so filters/sorts can use an index
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False,
+                                          help_text="Discount price if set, else price.")
+    price_per_piece = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False,
+                                          help_text="effective_price divided by the pieces in the set.")
+
+    # Summary of the colors, kept in sync by ProductQuerySet.refresh_stock()
+    total_stock = models.PositiveIntegerField(default=0, editable=False, help_text="Sets in stock over all colors.")
+    has_stock = models.BooleanField(default=False, editable=False)
+    primary_color = models.ForeignKey('ProductColor', null=True, blank=True, editable=False,
+                                      on_delete=models.SET_NULL, related_name='+')
+
+    # Full-text search (maintained by user/search.py via signals)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            # (price, id) matches the keyset pagination order in user/pagination.py
+            models.Index(fields=['effective_price', 'id'], name='product_effective_price_idx'),
+            models.Index(fields=['price_per_piece', 'id'], name='product_price_per_piece_idx'),
+            models.Index(fields=['-popularity', '-id'], name='product_popularity_idx'),
+            # "Hide out of stock": only the sellable rows, in the default listing order
+            models.Index(fields=['-id'], condition=Q(has_stock=True), name='product_in_stock_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        composition = parse_pack_composition(self.sizes)
+        self.total_pieces = sum(composition.values())
+        self.update_stored_prices()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'discount_price', 'sizes'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'total_pieces', 'effective_price', 'price_per_piece'}
+        # One transaction, so the post_save re-index (on_commit) sees the pack/attribute rows
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or 'sizes' in update_fields:
+                self.sync_pack_sizes(composition)
+            if update_fields is None or {'name', 'description', 'html_description'} & set(update_fields):
+                self.sync_attributes()
+
+    def update_stored_prices(self):
+        self.effective_price, self.price_per_piece = stored_prices(self.price, self.discount_price, self.total_pieces)
+
+    def sync_pack_sizes(self, composition=None):
+        """Rewrites the ProductPackSize rows, only when the composition changed."""
+        if composition is None:
+            composition = parse_pack_composition(self.sizes)
+        if dict(self.pack_sizes.values_list('size', 'pieces')) == composition:
+            return
+        self.pack_sizes.all().delete()
+        ProductPackSize.objects.bulk_create(
+            ProductPackSize(product=self, size=size, pieces=pieces) for size, pieces in composition.items()
+        )
+
+    def sync_attributes(self):
+        """Rewrites the ProductAttribute rows from the text, only when they changed."""
+        extracted = product_attributes(self)
+        if set(self.attributes.values_list('name', 'value')) == extracted:
+            return
+        self.attributes.all().delete()
+        ProductAttribute.objects.bulk_create(
+            ProductAttribute(product=self, name=name, value=value) for name, value in sorted(extracted)
+        )
 
     def __str__(self):
         return self.name
 
     def get_total_pieces_in_set(self):
-        total_pieces = 0
-        pieces_matches = re.findall(r'(\d+)?([A-Z]{1,3}|\d{2})', self.sizes.replace(' ', ''))
-        for count_str, _ in pieces_matches:
-            try:
-                total_pieces += int(count_str) if count_str else 1
-            except ValueError: continue
-        return total_pieces
+        return self.total_pieces
 
     def get_current_price_per_piece(self):
         total = self.get_total_pieces_in_set()
@@ -116,6 +224,88 @@ class Product(models.Model):
         price = self.discount_price if self.discount_price else self.price
         return price / total
 
+
+PACK_SIZE_RE = re.compile(r'(\d+)?([A-Z]{1,3}|\d{2})')
+
+
+def parse_pack_composition(sizes):
+    """'1S, 2M, 1L' -> {'S': 1, 'M': 2, 'L': 1}; a size without a count is one piece."""
+    composition = {}
+    for count_str, size in PACK_SIZE_RE.findall((sizes or '').replace(' ', '').upper()):
+        composition[size] = composition.get(size, 0) + (int(count_str) if count_str else 1)
+    return composition
+
+
+def stock_summary(colors):
+    """
+    Update expressions for Product's stock columns, given a ProductColor
+    queryset filtered on product=OuterRef('pk'); also used by migrations.
+    """
+    total = colors.order_by().values('product').annotate(total=Sum('stock')).values('total')
+    return {
+        'total_stock': Coalesce(Subquery(total), Value(0)),
+        'has_stock': Exists(colors.filter(stock__gt=0)),
+        'primary_color': Subquery(colors.order_by('-is_primary', 'id').values('id')[:1]),
+    }
+
+
+def stored_prices(price, discount_price, total_pieces):
+    """(effective_price, price_per_piece) as stored on Product; also used by migrations."""
+    effective_price = discount_price if discount_price else price
+    per_piece = Decimal(effective_price) / total_pieces if total_pieces else Decimal('0')
+    return effective_price, per_piece.quantize(Decimal('0.01'))
+
+
+# -----------------------------------------------------------
+# 3b. PACK COMPOSITION (one row per size in a set)
+# -----------------------------------------------------------
+class ProductPackSize(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='pack_sizes')
+    size = models.CharField(max_length=3, help_text="Size token, e.g. 'M' or '32'.")
+    pieces = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('product', 'size')
+        # (size, product) lets "products in size M" be an index-only join
+        indexes = [models.Index(fields=['size', 'product'], name='pack_size_product_idx')]
+
+    def __str__(self):
+        return f"{self.pieces}{self.size}"
+
+# -----------------------------------------------------------
+# 3c. RELATED PRODUCTS (precomputed by user/recommendations.py)
+# -----------------------------------------------------------
+class RelatedProduct(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_for')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        # The detail page reads one product's rows in rank order.
+        unique_together = ('product', 'rank')
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
+
+# -----------------------------------------------------------
+# 3d. EXTRACTED ATTRIBUTES (sleeve, fabric, fit, neckline; see user/attributes.py)
+# -----------------------------------------------------------
+class ProductAttribute(models.Model):
+    ATTRIBUTE_CHOICES = [(name, name.title()) for name in ATTRIBUTES]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='attributes')
+    name = models.CharField(max_length=20, choices=ATTRIBUTE_CHOICES)
+    value = models.CharField(max_length=40)
+
+    class Meta:
+        unique_together = ('product', 'name', 'value')
+        # (name, value, product): "products with fabric=Cotton" is an index-only scan
+        indexes = [models.Index(fields=['name', 'value', 'product'], name='product_attribute_value_idx')]
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
 # -----------------------------------------------------------
 # 4. PRODUCT COLOR VARIANT
 # -----------------------------------------------------------
@@ -126,6 +316,8 @@ class ProductColor(models.Model):
     hex_code = models.CharField(max_length=7)
     is_primary = models.BooleanField(default=False)
     stock = models.PositiveIntegerField(default=0)
+    # Nearest color family of hex_code (user/color_families.py); the color filter matches on it
+    family = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
 
     # ✅ ADDED BACK: Fixed "Out of Stock" frontend issue
     @property
@@ -146,7 +338,16 @@ class ProductColor(models.Model):
                     counter += 1
                     new_slug = f"{base_slug}-{counter}"
                 self.slug = new_slug
-        super().save(*args, **kwargs)
+        self.family = color_family(self.hex_code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'hex_code' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'family'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Product.objects.filter(pk=self.product_id).refresh_stock()
+
+    # Deletes (including queryset and cascade deletes) refresh the product's
+    # stock from the post_delete handler in user/signals.py.
 
     class Meta:
         unique_together = ('product', 'slug')
@@ -160,8 +361,9 @@ class ProductColor(models.Model):
 # -----------------------------------------------------------
 class ProductImage(models.Model):
     color = models.ForeignKey(ProductColor, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to=get_variant_image_path)
+    image = models.ImageField(upload_to=get_variant_image_path, storage=media_storage, max_length=255)
     alt_text = models.CharField(max_length=160, blank=True, help_text="SEO alt text for variant image")
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)  # user/images.py
 
     def __str__(self):
         return f"Image for {self.color}"
@@ -226,9 +428,10 @@ class Course(models.Model):
     short_description = models.TextField()
     long_description = models.TextField()
     html_content = RichTextField(blank=True, null=True)
-    thumbnail = models.ImageField(upload_to="courses/thumbnails/")
-    banner = models.ImageField(upload_to="courses/banners/", blank=True, null=True)
+    thumbnail = models.ImageField(upload_to="courses/thumbnails/", storage=media_storage, max_length=255)
+    banner = models.ImageField(upload_to="courses/banners/", storage=media_storage, max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # sitemap lastmod
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -248,7 +451,7 @@ class CourseVideo(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="videos")
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
-    thumbnail = models.ImageField(upload_to="courses/videos/thumbnails/", blank=True, null=True)
+    thumbnail = models.ImageField(upload_to="courses/videos/thumbnails/", storage=media_storage, max_length=255, blank=True, null=True)
     video_file = models.FileField(upload_to="courses/videos/")
 
     def __str__(self):
@@ -275,4 +478,41 @@ class CourseEnrollment(models.Model):
         unique_together = ("user", "course")
 
     def __str__(self):
-        return f"{self.user} - {self.course} ({self.status})"
\ No newline at end of file
+        return f"{self.user} - {self.course} ({self.status})"
+# -----------------------------------------------------------
+# 9. SHOPPER EVENTS (buffered by user/events.py)
+# -----------------------------------------------------------
+class ShopperEvent(models.Model):
+    """Raw, append-only events; `manage.py rollup_events` folds them into the daily tables."""
+    KIND_CHOICES = (("view", "Product view"), ("search", "Search"), ("suggest", "Suggestion lookup"))
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    product_id = models.IntegerField(null=True, blank=True)  # no FK: events outlive products
+    query = models.CharField(max_length=100, blank=True)
+    results = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+
+class ProductViewDaily(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_views')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'day')
+        indexes = [models.Index(fields=['day', 'product'], name='product_view_day_idx')]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.views}"
+
+class SearchQueryDaily(models.Model):
+    kind = models.CharField(max_length=10, choices=ShopperEvent.KIND_CHOICES)
+    query = models.CharField(max_length=100)
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+    zero_results = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('kind', 'query', 'day')
+        indexes = [models.Index(fields=['day', 'kind'], name='search_query_day_idx')]
+
+    def __str__(self):
+        return f"{self.kind} '{self.query}' on {self.day}: {self.count}"
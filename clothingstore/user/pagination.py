@@ -0,0 +1,172 @@
+"""
+Keyset (cursor) pagination for the product grids.
+
+Instead of OFFSET, each page remembers the sort key of its last product and
+the next page asks for rows strictly "after" it, e.g. for price low-to-high:
+
+    WHERE (effective_price, id) > (last_price, last_id)
+    ORDER BY effective_price, id LIMIT 25
+
+so page 200 costs the same as page 1.
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 24
+
+# sort name -> ((field, descending), ...); `id` is always the final tiebreaker.
+SORTS = {
+    'low': (('effective_price', False), ('id', False)),
+    'high': (('effective_price', True), ('id', True)),
+    'piece': (('price_per_piece', False), ('id', False)),
+    'new': (('created_at', True), ('id', True)),
+    'popular': (('popularity', True), ('id', True)),
+    'relevance': (('rank', True), ('id', True)),
+    'default': (('id', True),),
+}
+
+
+BIGINT_MAX = 2 ** 63 - 1
+DECIMAL_MAX_EXPONENT = 20
+DECIMAL_MAX_DIGITS = 40
+
+
+def _as_int(value):
+    if isinstance(value, bool) or not isinstance(value, int) or not -BIGINT_MAX <= value <= BIGINT_MAX:
+        raise ValueError(value)
+    return value
+
+
+def _as_float(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(value)
+    return float(value)
+
+
+def _as_decimal(value):
+    if not isinstance(value, str):
+        raise ValueError(value)
+    number = Decimal(value)
+    # Price columns are numeric(10, 2); anything far outside that (1e999999999)
+    # would overflow PostgreSQL's numeric comparison instead of matching nothing.
+    if (not number.is_finite() or abs(number.adjusted()) > DECIMAL_MAX_EXPONENT
+            or len(number.as_tuple().digits) > DECIMAL_MAX_DIGITS):
+        raise ValueError(value)
+    return number
+
+
+def _as_datetime(value):
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+# sort key -> converter for the value a client sends back in the cursor
+KEY_TYPES = {
+    'id': _as_int,
+    'effective_price': _as_decimal,
+    'price_per_piece': _as_decimal,
+    'created_at': _as_datetime,
+    'popularity': _as_float,
+    'rank': _as_float,
+}
+
+
+def resolve_sort(sort_by, queryset):
+    """Maps the ?sort= value onto a key in SORTS."""
+    ranked = 'rank' in queryset.query.annotations
+    if sort_by == 'relevance' or (not sort_by and ranked):
+        return 'relevance' if ranked else 'default'
+    return sort_by if sort_by in SORTS else 'default'
+
+
+def encode_cursor(values):
+    payload = []
+    for value in values:
+        if isinstance(value, Decimal):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        payload.append(value)
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, converters):
+    """
+    Returns the list of key values, each checked and converted by its entry
+    in `converters` (see KEY_TYPES), or None for a missing, garbled or
+    tampered cursor: the client controls it.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != len(converters):
+        return None
+    try:
+        return [convert(value) for convert, value in zip(converters, values)]
+    except (ValueError, TypeError, InvalidOperation, OverflowError):
+        return None
+
+
+def _after(keys, values):
+    """(k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... with per-key direction."""
+    condition = Q()
+    for i, (field, descending) in enumerate(keys):
+        step = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[i]})
+        for j in range(i):
+            step &= Q(**{keys[j][0]: values[j]})
+        condition |= step
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginate(queryset, sort_by=None, cursor=None, page_size=PAGE_SIZE):
+    """Orders `queryset` by the requested sort and returns one KeysetPage."""
+    sort = resolve_sort(sort_by, queryset)
+    keys = SORTS[sort]
+
+    queryset = queryset.order_by(*[('-' if desc else '') + field for field, desc in keys])
+
+    values = decode_cursor(cursor, [KEY_TYPES[field] for field, _ in keys])
+    if values is not None:
+        try:
+            queryset = queryset.filter(_after(keys, values))
+        except (ValidationError, TypeError, ValueError):
+            pass    # first page
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, field) for field, _ in keys])
+    return KeysetPage(items, next_cursor)
@@ -0,0 +1,83 @@
+"""
+Sales-velocity popularity.
+
+Every paid OrderItem adds its quantity (packs) to its product's score, decayed
+by age with a half-life of HALF_LIFE_DAYS:
+
+    popularity(p) = sum(quantity * 0.5 ** (age_days / HALF_LIFE_DAYS))
+
+A category scores the sum of its products. Scores are written to the indexed
+`popularity` columns by `manage.py update_popularity` (run it from cron, e.g.
+hourly), so the popular grids and the search landing page just read an
+index in order instead of aggregating orders per request.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .recommendations import PAID_STATUSES
+
+HALF_LIFE_DAYS = 14
+WINDOW_DAYS = HALF_LIFE_DAYS * 8   # older sales are worth < 0.4% and are skipped
+
+ROTATION_POOL = 12        # the search page rotates through this many top categories
+ROTATION_PERIOD = 60 * 60  # seconds each selection stays up
+
+
+def compute_scores(now=None):
+    """Returns ({product_id: score}, {category_id: score})."""
+    from order.models import OrderItem
+    from .models import Product
+
+    now = now or timezone.now()
+    sales = OrderItem.objects.filter(
+        order__payment_status__in=PAID_STATUSES,
+        order__created_at__gte=now - timedelta(days=WINDOW_DAYS),
+        product__isnull=False,
+    ).values_list('product_id', 'quantity', 'order__created_at')
+
+    product_scores = defaultdict(float)
+    for product_id, quantity, created_at in sales:
+        age_days = (now - created_at).total_seconds() / 86400
+        product_scores[product_id] += quantity * 0.5 ** (age_days / HALF_LIFE_DAYS)
+
+    category_scores = defaultdict(float)
+    memberships = Product.categories.through.objects.filter(product_id__in=list(product_scores))
+    for product_id, category_id in memberships.values_list('product_id', 'category_id'):
+        category_scores[category_id] += product_scores[product_id]
+    return dict(product_scores), dict(category_scores)
+
+
+def _write_scores(model, scores):
+    """Zeroes rows that dropped out, then bulk-updates the rest; returns rows written."""
+    stale = model.objects.exclude(popularity=0).exclude(id__in=list(scores))
+    stale.update(popularity=0)
+    objs = [model(id=pk, popularity=round(score, 6)) for pk, score in scores.items()]
+    model.objects.bulk_update(objs, ['popularity'], batch_size=1000)
+    return len(objs)
+
+
+def update_popularity(now=None):
+    from .models import Category, Product
+
+    product_scores, category_scores = compute_scores(now)
+    with transaction.atomic():
+        products = _write_scores(Product, product_scores)
+        categories = _write_scores(Category, category_scores)
+    return products, categories
+
+
+def rotating_selection(items, count, pool=ROTATION_POOL, period=ROTATION_PERIOD, now=None):
+    """
+    A `count`-long window over the first `pool` items (already ranked) that
+    moves along by one every `period` seconds, so the page stays varied
+    without an ORDER BY random() and is identical for everyone within a period.
+    """
+    pool_items = list(items)[:pool]
+    if len(pool_items) <= count:
+        return pool_items
+    offset = int((now if now is not None else time.time()) // period) % len(pool_items)
+    return [pool_items[(offset + i) % len(pool_items)] for i in range(count)]
@@ -0,0 +1,116 @@
+"""
+Everything the product detail page needs, loaded in a fixed number of queries:
+
+    1. the product
+    2. its colors (prefetch, ordered by id)
+    3. the images of those colors (prefetch)
+    4. its categories (prefetch)
+    5. related products (one indexed read of RelatedProduct)
+
+The assembled bundle is cached per (product slug, color slug) under the
+catalog version, so it is rebuilt only after a catalog edit. The image sets
+of all colors are derived from the same bundle for the swatch endpoint.
+Stock and recommendation changes drop single products' entries with
+`invalidate_products` instead.
+"""
+import hashlib
+import json
+
+from django.db.models import Prefetch
+
+from .catalog_cache import forget, get_or_set
+from .models import Product, ProductColor
+
+RELATED_LIMIT = 4
+
+
+def _build_bundle(slug, color_slug):
+    product = (
+        Product.objects.filter(slug=slug)
+        .prefetch_related(
+            Prefetch('colors', queryset=ProductColor.objects.order_by('id').prefetch_related('images')),
+            'categories',
+        )
+        .first()
+    )
+    if product is None:
+        return None
+
+    all_colors = list(product.colors.all())
+    colors = [color for color in all_colors if color.slug]
+    if color_slug:
+        selected = next((color for color in all_colors if color.slug == color_slug), None)
+        if selected is None:
+            return None
+    else:
+        selected = next((color for color in colors if color.is_primary), None) or (colors[0] if colors else None)
+
+    # Precomputed by user/recommendations.py; products added since the last
+    # build fall back to a live category match.
+    related_products = list(
+        Product.objects.cards().filter(recommended_for__product=product).order_by('recommended_for__rank')[:RELATED_LIMIT]
+    )
+    category_ids = [category.id for category in product.categories.all()]
+    if not related_products and category_ids:
+        related_products = list(
+            Product.objects.cards().filter(categories__in=category_ids).exclude(id=product.id).distinct()[:RELATED_LIMIT]
+        )
+
+    return {
+        'product': product,
+        'colors': colors,
+        'primary_color': selected,
+        'sizes': sorted(filter(None, map(str.strip, product.sizes.split(',')))) if product.sizes else [],
+        'primary_image': product.primary_image.url if product.primary_image else '',
+        'color_images': list(selected.images.all()) if selected else [],
+        'related_products': related_products,
+    }
+
+
+def load_product_bundle(slug, color_slug=None):
+    """Returns the bundle dict, or None when the product/color does not exist."""
+    return get_or_set('product-bundle', lambda: _build_bundle(slug, color_slug), slug, color_slug or '')
+
+
+def _build_image_sets(slug):
+    bundle = load_product_bundle(slug)
+    if bundle is None:
+        return None
+    product = bundle['product']
+    payload = {
+        'product': product.slug,
+        'primary': product.primary_image.url if product.primary_image else '',
+        'hover': product.hover_image.url if product.hover_image else '',
+        'colors': [
+            {
+                'id': color.id,
+                'slug': color.slug,
+                'name': color.name,
+                'images': [
+                    {'url': image.image.url, 'alt': image.alt_text or product.name}
+                    for image in color.images.all()
+                ],
+            }
+            for color in product.colors.all()
+        ],
+    }
+    body = json.dumps(payload, separators=(',', ':'), sort_keys=True)
+    # Strong validator: the hash of the exact bytes we send.
+    return body, '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+
+
+def load_image_sets(slug):
+    """Returns (json_body, etag) for every color's images, or None if no such product."""
+    return get_or_set('product-images', lambda: _build_image_sets(slug), slug)
+
+
+def invalidate_products(product_ids):
+    """Drops the cached bundles (every color), image sets and cards of these products."""
+    entries = set()
+    rows = Product.objects.filter(id__in=list(product_ids)).values_list('id', 'slug', 'colors__slug')
+    for pk, slug, color_slug in rows:
+        entries.update({('product-bundle', slug, ''), ('product-images', slug), ('card', pk)})
+        if color_slug:
+            entries.add(('product-bundle', slug, color_slug))
+    if entries:
+        forget(entries)
@@ -0,0 +1,146 @@
+"""
+Precomputed "Shop Similar" recommendations, stored in RelatedProduct.
+
+For two products p and q:
+
+    score(p, q) = CO_PURCHASE_WEIGHT * orders containing both
+                + categories they share
+                + a popularity tiebreak below 1
+
+With A the product x category incidence matrix and B the order x product
+one, the category term is A @ A.T and the co-purchase term is B.T @ B. Both
+are kept sparse: A as the member list of each category, B.T @ B accumulated
+directly from the baskets (a basket holds a handful of products). A row is
+scored over a dense vector of the candidate products only, and keeps its
+TOP_N best non-zero scores.
+
+`manage.py build_recommendations` rebuilds the table; the signal handlers
+call `refresh_recommendations` for products whose categories changed or
+that were just paid for. A refresh only reads what those rows can score:
+the members of their categories and the baskets holding them (the only
+co-purchase rows a new order can change), never the whole catalog.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+
+TOP_N = 8
+CO_PURCHASE_WEIGHT = 3.0
+PAID_STATUSES = ('PAID', 'SHIPPING_FEE_PAID')
+
+
+class _CatalogMatrices:
+    """
+    Everything the scorer needs, loaded with four flat queries. With
+    `for_products`, only what those products' rows can score is read: the
+    members of their categories and the baskets containing one of them.
+    """
+
+    def __init__(self, for_products=None):
+        from order.models import OrderItem
+        from .models import Product
+
+        memberships = Product.categories.through.objects.all()
+        items = OrderItem.objects.filter(order__payment_status__in=PAID_STATUSES, product__isnull=False)
+        products = Product.objects.all()
+        wanted = None
+        if for_products is not None:
+            wanted = set(for_products)
+            memberships = memberships.filter(category_id__in=Product.categories.through.objects.filter(
+                product_id__in=wanted).values('category_id'))
+            items = items.filter(order_id__in=OrderItem.objects.filter(product_id__in=wanted).values('order_id'))
+
+        members = defaultdict(list)         # category -> product ids (A, by column)
+        self.categories_of = defaultdict(list)
+        for pid, cid in memberships.values_list('product_id', 'category_id'):
+            members[cid].append(pid)
+            self.categories_of[pid].append(cid)
+
+        baskets = defaultdict(set)
+        for order_id, pid in items.values_list('order_id', 'product_id'):
+            baskets[order_id].add(pid)
+        self.co_purchases = defaultdict(lambda: defaultdict(int))  # B.T @ B, row -> {col: count}
+        for basket in baskets.values():
+            for p in basket:
+                if wanted is not None and p not in wanted:
+                    continue
+                for q in basket:
+                    if p != q:
+                        self.co_purchases[p][q] += 1
+
+        if wanted is not None:
+            candidates = set(wanted).union(*members.values(), *map(set, self.co_purchases.values()))
+            products = products.filter(id__in=candidates)
+        # Products created or deleted since the queries above are simply
+        # left out: every lookup below goes through `position`.
+        rows = list(products.order_by('id').values_list('id', 'reviews_count'))
+        self.product_ids = np.array([pid for pid, _ in rows], dtype=np.int64)
+        self.position = {pid: i for i, (pid, _) in enumerate(rows)}
+        self.members = {
+            cid: np.array([self.position[pid] for pid in pids if pid in self.position], dtype=np.int64)
+            for cid, pids in members.items()
+        }
+
+        top = Product.objects.aggregate(top=Max('reviews_count'))['top'] or 0
+        reviews = np.array([count for _, count in rows], dtype=np.float32)
+        self.tiebreak = 0.5 * reviews / (top + 1)
+
+    def top_related(self, product_ids, top_n=TOP_N):
+        """Yields (product_id, [(related_id, score), ...]) for the given products."""
+        for pid in product_ids:
+            i = self.position.get(pid)
+            if i is None:
+                continue
+            scores = np.zeros(len(self.product_ids), dtype=np.float32)
+            for cid in self.categories_of.get(pid, ()):
+                scores[self.members[cid]] += 1
+            for other, count in self.co_purchases.get(pid, {}).items():
+                j = self.position.get(other)
+                if j is not None:
+                    scores[j] += CO_PURCHASE_WEIGHT * count
+            scores[i] = 0
+            scored = np.flatnonzero(scores)
+            scores = scores[scored] + self.tiebreak[scored]
+            # Best first, equal scores by id, so a refresh over fewer
+            # candidates picks what a full build would.
+            picked = np.lexsort((self.product_ids[scored], -scores))[:top_n]
+            yield pid, [(int(self.product_ids[scored[j]]), float(scores[j])) for j in picked]
+
+
+def _related_rows(results):
+    from .models import RelatedProduct
+
+    for product_id, related in results:
+        for rank, (related_id, score) in enumerate(related):
+            yield RelatedProduct(product_id=product_id, related_id=related_id, rank=rank, score=score)
+
+
+def build_recommendations(top_n=TOP_N):
+    """Recomputes the whole table; returns the number of rows written."""
+    from .models import RelatedProduct
+
+    matrices = _CatalogMatrices()
+    rows = list(_related_rows(matrices.top_related(matrices.product_ids.tolist(), top_n)))
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+def refresh_recommendations(product_ids, top_n=TOP_N):
+    """
+    Recomputes the rows of just these products. Co-purchase scores only
+    change between products of the same basket, so a paid order is fully
+    applied by refreshing its products; after a category change the other
+    products' rows catch up on the next build.
+    """
+    from .models import RelatedProduct
+
+    matrices = _CatalogMatrices(for_products=product_ids)
+    rows = list(_related_rows(matrices.top_related(product_ids, top_n)))
+    with transaction.atomic():
+        RelatedProduct.objects.filter(product_id__in=list(product_ids)).delete()
+        RelatedProduct.objects.bulk_create(rows)
+    return len(rows)
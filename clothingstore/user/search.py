@@ -0,0 +1,111 @@
+"""
+Full-text product search backed by PostgreSQL.
+
+Product.search_vector holds a weighted tsvector over
+    A: name
+    B: category names
+    C: description
+    D: html_description with the CKEditor markup stripped
+and is GIN-indexed, so a search is a single index lookup plus ts_rank instead
+of icontains scans over the largest text columns. Other database backends
+fall back to the old icontains filters so local sqlite setups keep working.
+"""
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Func, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'english'
+
+# Matches the phrases parse_price_filter understands, so they can be removed
+# from the text part of "oversized black under 500".
+PRICE_PHRASE_RE = re.compile(r'\b(under|above)\s+\d+|\bbetween\s+\d+\s+and\s+\d+', re.IGNORECASE)
+
+# Tags and HTML entities left behind by CKEditor.
+HTML_MARKUP_PATTERN = r'<[^>]*>|&[#a-zA-Z0-9]+;'
+
+
+def is_full_text_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def parse_price_filter(query):
+    """(min_price, max_price) from "under 500" / "above 500" / "between 300 and 500"."""
+    query = query.lower()
+    match = re.search(r'under\s+(\d+)', query)
+    if match:
+        return (None, int(match.group(1)))
+    match = re.search(r'above\s+(\d+)', query)
+    if match:
+        return (int(match.group(1)), None)
+    match = re.search(r'between\s+(\d+)\s+and\s+(\d+)', query)
+    if match:
+        return (int(match.group(1)), int(match.group(2)))
+    return None, None
+
+
+def strip_price_phrases(query):
+    return ' '.join(PRICE_PHRASE_RE.sub(' ', query).split())
+
+
+def _search_vector_expression(Category):
+    category_names = Subquery(
+        Category.objects.filter(products=OuterRef('pk'))
+        .order_by()
+        .values('products')
+        .annotate(names=StringAgg('name', delimiter=' '))
+        .values('names')
+    )
+    plain_html = Func(
+        F('html_description'), Value(HTML_MARKUP_PATTERN), Value(' '), Value('g'),
+        function='regexp_replace', output_field=TextField(),
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(category_names, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+        + SearchVector(plain_html, weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(product_ids=None, models=None):
+    """
+    Recomputes search_vector in one set-based UPDATE.
+    Pass product_ids to limit it to the products that changed; migrations
+    pass their historical (Product, Category) models.
+    """
+    if models is None:
+        from .models import Product, Category
+    else:
+        Product, Category = models
+
+    if not is_full_text_enabled():
+        return 0
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=list(product_ids))
+    return products.update(search_vector=_search_vector_expression(Category))
+
+
+def search_products(queryset, query):
+    """
+    Filters a Product queryset by free text and annotates `rank`
+    (higher is more relevant).
+    """
+    if is_full_text_enabled():
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        # ts_rank returns float4; widen it so keyset cursors round-trip exactly.
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        )
+
+    text_filter = (
+        Q(name__icontains=query) |
+        Q(description__icontains=query) |
+        Q(html_description__icontains=query) |
+        Q(categories__name__icontains=query)
+    )
+    return queryset.filter(text_filter).distinct().annotate(rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,176 @@
+"""
+Cached search results.
+
+A search request is reduced to a canonical key first, so spelling variants of
+the same search share one entry:
+
+    "Oversized  BLACK under 500" + size=L&size=m + no sort
+    -> ('oversized black', None, '500', ('l', 'm'), ..., False, 'relevance')
+
+The text is lowercased and whitespace-collapsed with its price phrase taken
+out, the price phrase (or the min/max inputs) becomes normalized bounds, each
+facet list is normalized, de-duplicated and sorted, and the sort is resolved
+the way the paginator would resolve it.
+
+The entry is the ordered product ids as a compact array('q') plus the total
+count, stored under the catalog version, so any catalog edit invalidates every
+search at once. A page is a slice of that array and one `in_bulk` for the ids
+on screen; the cursor is the offset of the next slice.
+
+The facet counts come from the in-memory index restricted to the text hits
+(a bitmap of the ids `search_products` matches, cached per text), so each
+filter shows how many of this search's results it would keep.
+"""
+from array import array
+from decimal import Decimal
+
+from .catalog_cache import catalog_categories, get_or_set, popularity_version
+from .catalog_index import get_catalog_index, normalize_facet_value, to_decimal
+from .pagination import KEY_TYPES, PAGE_SIZE, SORTS, KeysetPage, decode_cursor, encode_cursor
+from .search import parse_price_filter, search_products, strip_price_phrases
+
+# Deeper pages than this are rare; past it the ids are not cached and the
+# page is read straight from the database.
+MAX_CACHED_IDS = 5000
+FACET_PARAMS = ('size', 'color', 'sleeves', 'category', 'fabric', 'fit', 'neckline')
+
+
+def _price_key(value):
+    value = to_decimal(value)
+    if value is None:
+        return None
+    return str(value.quantize(Decimal('1')) if value == value.to_integral() else value.normalize())
+
+
+def normalize_search(params):
+    """
+    Canonical form of a search request (a QueryDict or dict of lists).
+    Returns a dict whose `key` is a hashable tuple of everything that
+    affects which products match and in what order.
+    """
+    query = ' '.join(params.get('q', '').split())
+    min_price = params.get('min_price') or None
+    max_price = params.get('max_price') or None
+
+    text = ''
+    if query:
+        min_price_query, max_price_query = parse_price_filter(query)
+        if min_price_query is not None:
+            min_price = min_price_query
+        if max_price_query is not None:
+            max_price = max_price_query
+        text = strip_price_phrases(query).lower()
+
+    facets = {
+        name: tuple(sorted({normalize_facet_value(v) for v in params.getlist(name) if v}))
+        for name in FACET_PARAMS
+    }
+
+    in_stock = bool(params.get('in_stock'))
+
+    sort_by = params.get('sort')
+    if sort_by == 'relevance' or (not sort_by and text):
+        sort = 'relevance' if text else 'default'
+    else:
+        sort = sort_by if sort_by in SORTS else 'default'
+
+    min_key, max_key = _price_key(min_price), _price_key(max_price)
+    return {
+        'query': query,
+        'text': text,
+        'min_price': min_price,
+        'max_price': max_price,
+        'facets': facets,
+        'in_stock': in_stock,
+        'sort': sort,
+        'key': (text, min_key, max_key, *(facets[name] for name in FACET_PARAMS), in_stock, sort),
+    }
+
+
+def _search_queryset(search, facets):
+    from .models import Product
+
+    products = Product.objects.all()
+    if search['text']:
+        products = search_products(products, search['text'])
+    products = facets.apply(products)
+    if search['in_stock']:
+        products = products.in_stock()
+    return products.order_by(*[('-' if desc else '') + field for field, desc in SORTS[search['sort']]])
+
+
+def _build_results(search, facets):
+    from .models import Category
+
+    products = _search_queryset(search, facets)
+    ids = list(products.values_list('id', flat=True)[:MAX_CACHED_IDS + 1])
+    count = len(ids) if len(ids) <= MAX_CACHED_IDS else products.count()
+    category_ids = []
+    if search['text']:
+        category_ids = list(Category.objects.filter(name__icontains=search['text']).values_list('id', flat=True))
+    return {
+        'ids': array('q', ids[:MAX_CACHED_IDS]),
+        'count': count,
+        'category_ids': category_ids,
+    }
+
+
+class SearchResults:
+    def __init__(self, search, facets, results):
+        self.search = search
+        self.facets = facets
+        self.ids = results['ids']
+        self.count = results['count']
+        category_ids = set(results['category_ids'])
+        self.matched_categories = [c for c in catalog_categories() if c.id in category_ids]
+
+    def page(self, cursor=None, page_size=PAGE_SIZE):
+        """The KeysetPage at offset `cursor`, loading only the visible products."""
+        from .models import Product
+
+        values = decode_cursor(cursor, [KEY_TYPES['id']])
+        offset = min(max(values[0], 0), self.count) if values else 0
+        end = offset + page_size
+
+        if end <= len(self.ids) or len(self.ids) == self.count:
+            page_ids = self.ids[offset:end]
+            found = Product.objects.cards().in_bulk(list(page_ids))
+            items = [found[pk] for pk in page_ids if pk in found]
+        else:
+            items = list(_search_queryset(self.search, self.facets).cards()[offset:end])
+
+        next_cursor = encode_cursor([end]) if end < self.count else None
+        return KeysetPage(items, next_cursor)
+
+
+def _text_bitmap(text):
+    """The ids matching the free text as an index bitmap, cached per catalog version."""
+    from .models import Product
+
+    def build():
+        bitmap = 0
+        for pk in search_products(Product.objects.all(), text).values_list('id', flat=True):
+            bitmap |= 1 << pk
+        return bitmap
+
+    return get_or_set('search-text-ids', build, text)
+
+
+def search_results(params):
+    """Normalizes the request and returns its (cached) SearchResults."""
+    search = normalize_search(params)
+    facets = get_catalog_index().search(
+        restrict_to=_text_bitmap(search['text']) if search['text'] else None,
+        sizes=search['facets']['size'],
+        colors=search['facets']['color'],
+        sleeves=search['facets']['sleeves'],
+        fabrics=search['facets']['fabric'],
+        fits=search['facets']['fit'],
+        necklines=search['facets']['neckline'],
+        categories=search['facets']['category'],
+        min_price=search['min_price'],
+        max_price=search['max_price'],
+    )
+    popularity = popularity_version() if search['sort'] == 'popular' else ''
+    results = get_or_set('search-results', lambda: _build_results(search, facets), *search['key'], popularity)
+    return SearchResults(search, facets, results)
@@ -0,0 +1,209 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from owner.models import Blog
+from .models import Category, Product, ProductColor, ProductImage
+from .catalog_cache import bump_catalog_version
+from .catalog_index import advance_catalog_index, get_catalog_index
+from .images import needs_processing, process_instance
+from .product_bundle import invalidate_products
+from .recommendations import PAID_STATUSES, refresh_recommendations
+from .search import update_search_vectors
+
+
+# -----------------------------------------------------------
+# 1. SEARCH & FACET INDEX MAINTENANCE
+# -----------------------------------------------------------
+def _refresh_products(product_ids):
+    """Re-indexes products once the surrounding transaction commits."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    def refresh():
+        get_catalog_index().refresh_products(product_ids)
+        update_search_vectors(product_ids)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Product)
+def index_product_saved(sender, instance, **kwargs):
+    _refresh_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def index_product_deleted(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: get_catalog_index().remove_products([product_id]))
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def index_product_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        _refresh_products([instance.pk])
+    elif action == 'pre_clear':
+        # pk_set is empty on clear, so remember who was in the category.
+        instance._index_cleared_ids = list(instance.products.values_list('id', flat=True))
+    elif action == 'post_clear':
+        _refresh_products(getattr(instance, '_index_cleared_ids', []))
+    else:
+        _refresh_products(pk_set or [])
+
+
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+def index_color_changed(sender, instance, **kwargs):
+    _refresh_products([instance.product_id])
+
+
+_stock_refresh = threading.local()
+
+
+@receiver(post_delete, sender=ProductColor)
+def stock_color_deleted(sender, instance, **kwargs):
+    """
+    Recomputes total_stock / has_stock / primary_color of the color's product
+    on commit. A bulk or cascading delete fires this once per color; the
+    first callback refreshes every product collected so far and the rest
+    find nothing left to do. (Ids left over from a rolled-back transaction
+    are just refreshed once more.)
+    """
+    pending = getattr(_stock_refresh, 'product_ids', None)
+    if pending is None:
+        pending = _stock_refresh.product_ids = set()
+    pending.add(instance.product_id)
+
+    def refresh():
+        product_ids = set(pending)
+        pending.clear()
+        if product_ids:
+            Product.objects.filter(id__in=product_ids).refresh_stock()
+
+    # Registered before catalog_changed, so the bump comes after the refresh.
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Category)
+def index_category_saved(sender, instance, created, **kwargs):
+    if not created:
+        # A rename changes the facet value of every member product.
+        _refresh_products(instance.products.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def index_category_deleting(sender, instance, **kwargs):
+    instance._index_member_ids = list(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def index_category_deleted(sender, instance, **kwargs):
+    _refresh_products(getattr(instance, '_index_member_ids', []))
+
+
+# -----------------------------------------------------------
+# 2. CATALOG CACHE VERSION
+# -----------------------------------------------------------
+def bump_version():
+    """
+    Bumps the catalog version for a change this process's CatalogIndex
+    already reflects (or that the index doesn't hold, like stock), so the
+    local index is not rebuilt for it.
+    """
+    advance_catalog_index(bump_catalog_version())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductColor)
+@receiver(post_delete, sender=ProductColor)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def catalog_changed(sender, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def catalog_categories_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_version)
+
+
+# -----------------------------------------------------------
+# 3. RELATED-PRODUCT RECOMMENDATIONS
+# -----------------------------------------------------------
+def _refresh_recommendations(product_ids):
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    def refresh():
+        refresh_recommendations(product_ids)
+        # Only these products' bundles show their related products.
+        invalidate_products(product_ids)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def recommendations_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _refresh_recommendations(pk_set or [] if reverse else [instance.pk])
+
+
+@receiver(post_init, sender='order.Order')
+def recommendations_order_loaded(sender, instance, **kwargs):
+    # The status as stored, without loading it if the field was deferred.
+    instance._stored_payment_status = instance.__dict__.get('payment_status') if instance.pk else None
+
+
+@receiver(post_save, sender='order.Order')
+def recommendations_order_paid(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'payment_status' not in update_fields:
+        return
+    was_paid = getattr(instance, '_stored_payment_status', None) in PAID_STATUSES
+    instance._stored_payment_status = instance.payment_status
+    if was_paid or instance.payment_status not in PAID_STATUSES:
+        return    # not a payment: shipping updates, re-saves of a paid order
+
+    order_id = instance.pk
+
+    def refresh():
+        # Read on commit, so items created after the order in the same transaction count.
+        from order.models import OrderItem
+
+        product_ids = set(OrderItem.objects.filter(order_id=order_id, product__isnull=False)
+                          .values_list('product_id', flat=True))
+        if product_ids:
+            refresh_recommendations(product_ids)
+            invalidate_products(product_ids)
+
+    transaction.on_commit(refresh)
+
+
+# -----------------------------------------------------------
+# 4. RESPONSIVE IMAGE DERIVATIVES
+# -----------------------------------------------------------
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Blog)
+def images_saved(sender, instance, **kwargs):
+    if not needs_processing(instance):
+        return
+    model, pk = type(instance), instance.pk
+
+    def process():
+        current = model.objects.filter(pk=pk).first()
+        if current is not None and process_instance(current) and model is not Blog:
+            # Cached cards/bundles were rendered without the new size and preview.
+            bump_version()
+
+    transaction.on_commit(process)
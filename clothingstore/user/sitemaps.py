@@ -1,12 +1,217 @@
-from django.contrib.sitemaps import Sitemap
-from .models import Product # Assuming you have a Product model
+"""
+sitemap.xml as a sitemap index over paginated, streamed section files:
 
-class ProductSitemap(Sitemap):
-    # This determines how frequently a page is likely to change.
-    changefreq = "weekly"
-    # This is a priority score for a page, from 0.0 to 1.0.
+    /sitemap.xml                      index: one <sitemap> per section page
+    /sitemap-<section>-<page>.xml     up to SITEMAP_LIMIT <url> entries
+
+Section files read flat (location, lastmod) rows through a server-side
+cursor (`.iterator()`) and stream the XML as it is produced, so a crawler
+never makes us hold the whole catalog in memory. Each finished document is
+cached under a fingerprint of its section's content: the catalog version for
+products, colors and categories, and (row count, latest updated_at) for
+courses and blogs, so files are regenerated only after content changes.
+Course pages are login-gated, so the courses section lists only the public
+course list.
+"""
+import math
+from xml.sax.saxutils import escape
+
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+
+from .catalog_cache import DEFAULT_TIMEOUT, catalog_version, get_cache, stats, versioned_key
+
+SITEMAP_LIMIT = 50000   # URLs per file, the protocol maximum
+CHUNK_SIZE = 2000       # rows fetched per round trip from the server-side cursor
+CACHE_TIMEOUT = DEFAULT_TIMEOUT * 24
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+def _lastmod(value):
+    return value.date().isoformat() if value else None
+
+
+# -----------------------------------------------------------
+# 1. SECTIONS
+# -----------------------------------------------------------
+class SitemapSection:
+    changefreq = 'weekly'
+    priority = 0.5
+
+    def rows(self):
+        """Queryset of (url path args..., updated_at) tuples in a stable order."""
+        raise NotImplementedError
+
+    def location(self, row):
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Changes whenever the section's content does."""
+        return catalog_version()
+
+    def summary(self):
+        """(url count, latest lastmod) for the index."""
+        counts = self.rows().order_by().aggregate(count=Count('*'), last=Max(self.updated_field))
+        return counts['count'], counts['last']
+
+
+class ProductSitemap(SitemapSection):
     priority = 0.9
+    updated_field = 'updated_at'
+
+    def rows(self):
+        from .models import Product
+        return Product.objects.order_by('id').values_list('slug', 'updated_at')
+
+    def location(self, row):
+        return reverse('product_detail', args=[row[0]])
+
+
+class ColorSitemap(SitemapSection):
+    priority = 0.7
+    updated_field = 'product__updated_at'
+
+    def rows(self):
+        from .models import ProductColor
+        return (ProductColor.objects.exclude(slug='').order_by('id')
+                .values_list('product__slug', 'slug', 'product__updated_at'))
+
+    def location(self, row):
+        return reverse('product_color_detail', args=[row[0], row[1]])
+
+
+class CategorySitemap(SitemapSection):
+    changefreq = 'daily'
+    priority = 0.8
+    updated_field = 'updated_at'
+
+    def rows(self):
+        from .models import Category
+        return Category.objects.order_by('id').values_list('slug', 'updated_at')
+
+    def location(self, row):
+        return reverse('category_detail', args=[row[0]])
+
+
+class CourseSitemap(SitemapSection):
+    """
+    Only the public course list: a course page needs a login and an
+    enrollment, so crawlers would just be redirected to the login page.
+    """
+    priority = 0.6
+    updated_field = 'updated_at'
+
+    def rows(self):
+        from .models import Course
+        # One row, dated by the most recently updated course.
+        return Course.objects.order_by('-updated_at').values_list('updated_at')[:1]
+
+    def location(self, row):
+        return reverse('course_list')
+
+    def summary(self):
+        from .models import Course
+        counts = Course.objects.aggregate(count=Count('*'), last=Max('updated_at'))
+        return min(counts['count'], 1), counts['last']
+
+    def fingerprint(self):
+        return '%s-%s' % self.summary()
+
+
+class BlogSitemap(SitemapSection):
+    changefreq = 'monthly'
+    priority = 0.6
+    updated_field = 'updated_at'
+
+    def rows(self):
+        from owner.models import Blog
+        return Blog.objects.filter(is_published=True).order_by('id').values_list('slug', 'updated_at')
+
+    def location(self, row):
+        return reverse('blog_detail', args=[row[0]])
+
+    def fingerprint(self):
+        return '%s-%s' % self.summary()
+
+
+SECTIONS = {
+    'products': ProductSitemap(),
+    'colors': ColorSitemap(),
+    'categories': CategorySitemap(),
+    'courses': CourseSitemap(),
+    'blogs': BlogSitemap(),
+}
+
+
+# -----------------------------------------------------------
+# 2. DOCUMENTS
+# -----------------------------------------------------------
+def _url_entries(request, section, page):
+    rows = section.rows()[(page - 1) * SITEMAP_LIMIT:page * SITEMAP_LIMIT]
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        lastmod = _lastmod(row[-1])
+        yield (
+            '<url><loc>%s</loc>%s<changefreq>%s</changefreq><priority>%.1f</priority></url>\n' % (
+                escape(request.build_absolute_uri(section.location(row))),
+                '<lastmod>%s</lastmod>' % lastmod if lastmod else '',
+                section.changefreq,
+                section.priority,
+            )
+        )
+
+
+def _stream_and_cache(chunks, key):
+    """Yields the document in chunks and caches the whole of it once it is complete."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    get_cache().set(key, ''.join(parts), CACHE_TIMEOUT)
+
+
+def _cached_or_streamed(key, build):
+    document = get_cache().get(key)
+    stats.record('sitemap', document is not None)
+    if document is not None:
+        return HttpResponse(document, content_type=CONTENT_TYPE)
+    return StreamingHttpResponse(_stream_and_cache(build(), key), content_type=CONTENT_TYPE)
+
+
+def sitemap_index(request):
+    host = request.get_host()
+    fingerprints = [section.fingerprint() for section in SECTIONS.values()]
+
+    def build():
+        yield XML_HEADER + INDEX_OPEN
+        for name, section in SECTIONS.items():
+            count, last = section.summary()
+            lastmod = _lastmod(last)
+            for page in range(1, max(1, math.ceil(count / SITEMAP_LIMIT)) + 1):
+                loc = request.build_absolute_uri(reverse('sitemap_section', args=[name, page]))
+                yield '<sitemap><loc>%s</loc>%s</sitemap>\n' % (
+                    escape(loc), '<lastmod>%s</lastmod>' % lastmod if lastmod else ''
+                )
+        yield '</sitemapindex>\n'
+
+    return _cached_or_streamed(versioned_key('sitemap-index', host, *fingerprints), build)
+
+
+def sitemap_section(request, section, page):
+    if section not in SECTIONS or page < 1:
+        raise Http404("No such sitemap.")
+    sitemap = SECTIONS[section]
+    if page > 1 and (page - 1) * SITEMAP_LIMIT >= sitemap.summary()[0]:
+        raise Http404("No such sitemap page.")
+
+    def build():
+        yield XML_HEADER + URLSET_OPEN
+        yield from _url_entries(request, sitemap, page)
+        yield '</urlset>\n'
 
-    def items(self):
-        # Return all objects that you want to include in the sitemap.
-        return Product.objects.all()
\ No newline at end of file
+    key = versioned_key('sitemap', section, page, request.get_host(), sitemap.fingerprint())
+    return _cached_or_streamed(key, build)
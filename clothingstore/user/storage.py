@@ -0,0 +1,139 @@
+"""
+Content-addressed media storage.
+
+Uploads keep the SEO path their upload_to gives them and gain a digest of
+their bytes (the first HASH_LENGTH hex digits of SHA-256):
+
+    products/primary/black-tee.jpg -> products/primary/black-tee.3fa9c2d1e0b4f7a2.jpg
+
+A re-uploaded image is therefore a new URL, never a changed file behind an
+old one, so every hashed media URL is served with a far-future immutable
+Cache-Control (`serve_media`; derivatives inherit the digest in their names).
+Order snapshots that point at a product image keep showing the image that
+was bought.
+
+The bytes are stored once, under blobs/<ab>/<sha256><ext>; every name is a
+hard link to its blob. Identical uploads (the same photo on two products, a
+category image uploaded twice) share one copy on disk, and the blob's link
+count is its reference count: deleting a name removes the blob only when no
+other name still links to it.
+
+Configured as the "media" entry of settings.STORAGES and used by the
+public ImageFields through `media_storage`. `manage.py rehash_media` moves
+existing files to hashed names and rewrites the stored field values.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from glob import glob
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.views.static import serve
+
+HASH_LENGTH = 16
+BLOB_ROOT = 'blobs'
+
+# "<stem>.<digest><ext>", also matching derivatives "<stem>.<digest>-640w<ext>"
+HASHED_NAME_RE = re.compile(r'\.([0-9a-f]{%d})(?:-\d+w)?\.[A-Za-z0-9]+$' % HASH_LENGTH)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=3600'
+
+
+def media_storage():
+    """Callable storage for ImageFields, so migrations don't serialize the instance."""
+    return storages['media']
+
+
+def content_digest(content):
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME_RE.search(name or ''))
+
+
+def hashed_name(name, digest):
+    """'dir/stem.ext' -> 'dir/stem.<digest>.ext' (re-hashing replaces an old digest)."""
+    root, ext = os.path.splitext(name)
+    if is_hashed(name):
+        root = root.rsplit('.', 1)[0]
+    return f"{root}.{digest[:HASH_LENGTH]}{ext.lower()}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_name(self, digest, ext):
+        return f"{BLOB_ROOT}/{digest[:2]}/{digest}{ext.lower()}"
+
+    def get_available_name(self, name, max_length=None):
+        # A name is derived from the content, so an existing one already
+        # holds these bytes: no "_x7Gk2" collision suffixes.
+        return name
+
+    def _save(self, name, content):
+        digest = content_digest(content)
+        name = hashed_name(name, digest)
+        if self.exists(name):
+            return name
+
+        blob = self.path(self.blob_name(digest, os.path.splitext(name)[1]))
+        if not os.path.exists(blob):
+            self._write_blob(blob, content)
+        target = self.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(blob, target)
+        except FileExistsError:
+            pass    # an identical upload won the race
+        return name
+
+    def _write_blob(self, path, content):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in content.chunks():
+                    fh.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp, self.file_permissions_mode)
+            # Atomic: a concurrent identical upload replaces it with the same bytes.
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _blob_path(self, name):
+        match = HASHED_NAME_RE.search(name)
+        if not match:
+            return None
+        prefix = match.group(1)
+        found = glob(self.path(f"{BLOB_ROOT}/{prefix[:2]}/{prefix}*{os.path.splitext(name)[1].lower()}"))
+        return found[0] if found else None
+
+    def references(self, name):
+        """Number of names sharing this file's bytes (including `name`)."""
+        blob = self._blob_path(name)
+        if blob is None:
+            return 1 if self.exists(name) else 0
+        return os.stat(blob).st_nlink - 1
+
+    def delete(self, name):
+        blob = self._blob_path(name)
+        super().delete(name)
+        if blob and os.path.exists(blob) and os.stat(blob).st_nlink == 1:
+            os.remove(blob)   # that was the last name
+
+
+def serve_media(request, path):
+    """MEDIA_URL view: hashed names never change, so let browsers and CDNs keep them."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = IMMUTABLE if is_hashed(path) else REVALIDATE
+    return response
@@ -0,0 +1,196 @@
+"""
+Byte serving for protected course media (CourseVideo, CoursePDF).
+
+The views authorize, then hand the FieldFile to `serve_file`, which answers
+like a static file server would:
+
+- ETag / Last-Modified from the file's size and mtime, with If-None-Match,
+  If-Modified-Since (304) and If-Range honoured;
+- `Range: bytes=...` -> 206 Partial Content streamed from a seek, so a
+  player can seek or resume without re-downloading from byte zero;
+  unsatisfiable ranges -> 416;
+- several ranges are sorted and coalesced first, then sent as
+  multipart/byteranges. More than MAX_RANGES parts, or ranges adding up to
+  more than the file, are ignored and the whole file is sent once, so a
+  crafted header can't multiply the transfer.
+
+With settings.PROTECTED_MEDIA_OFFLOAD the bytes don't go through Python at
+all: Django answers with an empty response carrying X-Accel-Redirect
+(nginx, 'x-accel-redirect') or X-Sendfile (Apache/lighttpd, 'x-sendfile')
+and the front server does ranges and conditionals itself. nginx needs an
+internal location at PROTECTED_MEDIA_INTERNAL_URL:
+
+    location /protected-media/ { internal; alias /path/to/MEDIA_ROOT/; }
+"""
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+MAX_RANGES = 8
+CACHE_CONTROL = 'private, max-age=0, must-revalidate'
+
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+# -----------------------------------------------------------
+# 1. RANGE HEADER
+# -----------------------------------------------------------
+def parse_ranges(header, size):
+    """
+    'bytes=0-99,200-' -> sorted, coalesced [(start, end inclusive), ...].
+    None means "ignore the header, send everything" (absent, malformed,
+    abusive); [] means unsatisfiable (416).
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    ranges = []
+    for spec in header[len('bytes='):].split(','):
+        match = RANGE_RE.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '':                         # suffix: last N bytes
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        if start <= end and start < size:
+            ranges.append((start, end))
+    if not ranges:
+        return []
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    requested = sum(end - start + 1 for start, end in ranges)
+    if len(merged) > MAX_RANGES or requested > size:
+        return None
+    return merged
+
+
+# -----------------------------------------------------------
+# 2. BODIES
+# -----------------------------------------------------------
+def _read(file, start, end):
+    file.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = file.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _single(storage, name, start, end):
+    # Opened on first iteration, so an unconsumed response leaves no file open.
+    with storage.open(name, 'rb') as file:
+        yield from _read(file, start, end)
+
+
+def _multipart(storage, name, parts, closing):
+    with storage.open(name, 'rb') as file:
+        for header, (start, end) in parts:
+            yield header
+            yield from _read(file, start, end)
+    yield closing
+
+
+def _multipart_plan(ranges, size, content_type, boundary):
+    """[(part header bytes, range), ...] and the closing delimiter, so Content-Length is known up front."""
+    parts = [
+        (f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+         f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n".encode('ascii'), (start, end))
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode('ascii')
+    length = sum(len(header) + end - start + 1 for header, (start, end) in parts) + len(closing)
+    return parts, closing, length
+
+
+# -----------------------------------------------------------
+# 3. RESPONSES
+# -----------------------------------------------------------
+def _disposition(filename, as_attachment):
+    kind = 'attachment' if as_attachment else 'inline'
+    if not filename:
+        return kind
+    return f"{kind}; filename*=UTF-8''{quote(filename)}"
+
+
+def _offload(field_file, content_type, disposition):
+    mode = getattr(settings, 'PROTECTED_MEDIA_OFFLOAD', None)
+    if not mode:
+        return None
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel-redirect':
+        prefix = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix + quote(field_file.name)
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = field_file.path
+    else:
+        raise ValueError(f"Unknown PROTECTED_MEDIA_OFFLOAD {mode!r}")
+    response['Content-Disposition'] = disposition
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def serve_file(request, field_file, content_type, filename=None, as_attachment=False):
+    """Serves an authorized FieldFile with conditional and Range support (or offloads it)."""
+    disposition = _disposition(filename, as_attachment)
+    offloaded = _offload(field_file, content_type, disposition)
+    if offloaded is not None:
+        return offloaded
+
+    storage, name = field_file.storage, field_file.name
+    size = storage.size(name)
+    mtime = int(storage.get_modified_time(name).timestamp())
+    etag = f'"{mtime:x}-{size:x}"'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        return not_modified
+
+    ranges = parse_ranges(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if ranges is not None and if_range and if_range != etag and parse_http_date_safe(if_range) != mtime:
+        ranges = None   # the client's partial copy is of another version
+
+    if ranges == []:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif ranges is None:
+        response = StreamingHttpResponse(_single(storage, name, 0, size - 1), content_type=content_type)
+        response['Content-Length'] = str(size)
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(_single(storage, name, start, end),
+                                         status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        boundary = os.urandom(12).hex()
+        parts, closing, length = _multipart_plan(ranges, size, content_type, boundary)
+        response = StreamingHttpResponse(_multipart(storage, name, parts, closing), status=206,
+                                         content_type=f'multipart/byteranges; boundary={boundary}')
+        response['Content-Length'] = str(length)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Content-Disposition'] = disposition
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
@@ -0,0 +1,176 @@
+"""
+Prefix-trie autocomplete for the search box.
+
+Every word of every product name, category name and popular search term is
+inserted into a character trie (one trie per kind). Each trie node keeps the
+best few entries below it already ranked, so a lookup is a walk of
+len(prefix) dict hops and never touches the database. The tries are an
+immutable snapshot tied to the catalog version (user/catalog_cache.py): once
+a change bumps the version, the next request builds fresh ones and swaps the
+reference.
+"""
+import bisect
+import re
+import threading
+
+from .catalog_cache import catalog_version
+
+# Define trending/popular suggestions
+POPULAR_SEARCH_TERMS = [
+    "Tshirt", "White", "Oversized", "Dresses",
+    "Cotton", "Black",  "Formal", "Jeans"
+]
+
+TOP_K = 8            # entries returned at most
+MULTI_WORD_POOL = 64  # ranked candidates kept per node, scanned for multi-word queries
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Bonus for matching the first word of a name, so "jea" ranks "Jeans Slim"
+# above "Slim Jeans".
+LEADING_WORD_BONUS = 1000
+
+
+def normalize_prefix(text):
+    return ' '.join(WORD_RE.findall((text or '').lower()))
+
+
+def price_display(price, discount_price):
+    return f"₹{discount_price} (₹{price})" if discount_price else f"₹{price}"
+
+
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # [(-score, entry_id)] sorted, len <= pool
+
+
+class SuggestionTrie:
+    def __init__(self, entries, pool=MULTI_WORD_POOL):
+        """entries: list of dicts with name, payload and weight."""
+        self.entries = entries
+        self.words = []
+        self.root = _Node()
+        self._top_k = pool
+        for entry_id, entry in enumerate(entries):
+            words = WORD_RE.findall(entry['name'].lower())
+            self.words.append(words)
+            base = entry.get('weight', 0)
+            seen = set()
+            for position, word in enumerate(words):
+                if word in seen:
+                    continue
+                seen.add(word)
+                score = base + (LEADING_WORD_BONUS if position == 0 else 0)
+                self._insert(word, (-score, entry_id))
+
+    def _insert(self, word, item):
+        node = self.root
+        for char in word:
+            node = node.children.setdefault(char, _Node())
+            top = node.top
+            if len(top) < self._top_k or item < top[-1]:
+                bisect.insort(top, item)
+                if len(top) > self._top_k:
+                    top.pop()
+
+    def _node_for(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def complete(self, query, limit=TOP_K):
+        words = normalize_prefix(query).split()
+        if not words:
+            return []
+        # The last word is still being typed; earlier words must prefix-match too.
+        node = self._node_for(words[-1])
+        if node is None:
+            return []
+        leading = words[:-1]
+        results = []
+        for _, entry_id in node.top:
+            if leading and not all(
+                any(w.startswith(prefix) for w in self.words[entry_id]) for prefix in leading
+            ):
+                continue
+            results.append(self.entries[entry_id]['payload'])
+            if len(results) >= limit:
+                break
+        return results
+
+
+# -----------------------------------------------------------
+# BUILDING FROM THE CATALOG
+# -----------------------------------------------------------
+def _load_entries():
+    """Returns {kind: [entry, ...]} for products, categories and popular terms."""
+    from .models import Category, Product
+
+    products_entries, category_entries = [], []
+    products = Product.objects.cards()
+    for p in products:
+        products_entries.append({
+            'name': p.name,
+            'weight': p.reviews_count,
+            'payload': {
+                'name': p.name,
+                'slug': p.slug,
+                'image': p.primary_image.url if p.primary_image else '',
+                'price_display': price_display(p.price, p.discount_price),
+            },
+        })
+    for c in Category.objects.only('name', 'slug', 'image'):
+        category_entries.append({
+            'name': c.name,
+            'weight': 0,
+            'payload': {
+                'name': c.name,
+                'slug': c.slug,
+                'image': c.image.url if c.image else '',
+            },
+        })
+    # Earlier terms in the curated list rank first.
+    term_entries = [
+        {'name': term, 'weight': -rank, 'payload': term}
+        for rank, term in enumerate(POPULAR_SEARCH_TERMS)
+    ]
+    return {'products': products_entries, 'categories': category_entries, 'terms': term_entries}
+
+
+class Suggester:
+    """Holds the tries for one catalog version and rebuilds them when it moves on."""
+
+    def __init__(self):
+        self._tries = None
+        self._lock = threading.Lock()
+        self.version = None
+
+    def invalidate(self):
+        self._tries = None
+
+    def tries(self):
+        version = catalog_version()
+        tries = self._tries
+        if tries is None or self.version != version:
+            with self._lock:
+                tries = self._tries
+                if tries is None or self.version != version:
+                    tries = {kind: SuggestionTrie(entries) for kind, entries in _load_entries().items()}
+                    self._tries, self.version = tries, version
+        return tries
+
+    def etag(self, prefix):
+        """Suggestions only change with the catalog, so version + prefix identify a response."""
+        self.tries()
+        return '"sg-%s-%s"' % (self.version, prefix.replace(' ', '+'))
+
+    def suggest(self, query, limit=3):
+        return {kind: trie.complete(query, limit) for kind, trie in self.tries().items()}
+
+
+suggester = Suggester()
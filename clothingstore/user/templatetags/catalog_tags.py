@@ -0,0 +1,29 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from user.catalog_cache import cached_fragments
+from user.catalog_index import normalize_facet_value
+
+register = template.Library()
+
+
+@register.filter
+def facet_count(counts, value):
+    """Usage: {{ facet_counts.sizes|facet_count:size }}"""
+    if not counts:
+        return 0
+    return counts.get(normalize_facet_value(value), 0)
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """Current page URL with ?cursor= swapped for the given keyset cursor."""
+    params = context['request'].GET.copy()
+    params['cursor'] = cursor
+    return f"?{params.urlencode()}"
+
+
+@register.simple_tag
+def product_cards(products):
+    """Product cards from the per-product fragment cache, joined into one string."""
+    return mark_safe(''.join(cached_fragments('card', 'partials/product_card.html', products, 'product')))
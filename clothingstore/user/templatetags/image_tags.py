@@ -0,0 +1,42 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from user import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_sources(obj, field, sizes='100vw'):
+    """
+    <source> elements (AVIF, WebP) for a <picture> wrapped around the
+    original <img>. Empty until the derivatives exist, so the <img> fallback
+    keeps working.
+    Usage: <picture>{% image_sources product 'primary_image' '50vw' %}<img src=...></picture>
+    """
+    return format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, srcset, sizes) for mime, srcset in images.sources(obj, field)),
+    )
+
+
+@register.simple_tag
+def thumbnail_url(obj, field):
+    """Smallest derivative, else the original image URL."""
+    return images.thumbnail_url(obj, field)
+
+
+@register.simple_tag
+def image_size(obj, field):
+    """width="…" height="…" of the original, so the browser reserves its box before it loads."""
+    size = images.dimensions(obj, field)
+    return format_html('width="{}" height="{}"', *size) if size else ''
+
+
+@register.simple_tag
+def placeholder_style(obj, field):
+    """Inline blurred preview painted behind the <img> until the real image arrives."""
+    preview = images.placeholder(obj, field)
+    if not preview:
+        return ''
+    return format_html('background-image:url({});background-size:cover;background-position:center', preview)
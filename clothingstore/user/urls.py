@@ -12,6 +12,7 @@ urlpatterns = [
     path('product/<slug:product_slug>/<slug:color_slug>/', views.product_detail_by_color, name='product_color_detail'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     path('ajax/get-color-images/<int:color_id>/', views.get_color_images, name='get_color_images'),
+    path('ajax/product-images/<slug:slug>/', views.product_image_sets, name='product_image_sets'),
     path('cart/', views.cart_view, name='cart'),
     path('showroom/', views.showroom_view, name='showroom'),
     # urls.py
@@ -24,6 +25,8 @@ urlpatterns = [
     path('account/', views.account_view, name='account'),
     path('category/<slug:slug>/', views.category_detail, name='category_detail'),
     path("ajax/filter-popular-products/", views.filter_popular_products, name="filter_popular_products"),
+    path("ajax/product-grid/", views.product_grid_page, name="product_grid_page"),
+    path("ajax/catalog-cache-stats/", views.catalog_cache_report, name="catalog_cache_report"),
 
     path('login/', views.login_view, name='login'),
     path('verify-otp/', views.verify_otp_firebase, name='verify_otp'),
@@ -37,4 +40,6 @@ urlpatterns = [
     path("course/<slug:slug>/create-order/", views.create_order, name="create_order"),  # /course/<slug>/create-order/
     path("course/<slug:slug>/success/", views.payment_success, name="payment_success"), # /course/<slug>/success/
     path('course/video/<int:video_id>/', views.protected_video, name='protected_video'),
+    path('course/pdf/<int:pdf_id>/', views.protected_pdf, name='protected_pdf'),
+    path('course/media/<str:token>/', views.signed_media, name='signed_media'),
 ]
\ No newline at end of file
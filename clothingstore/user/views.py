@@ -27,7 +27,7 @@ from django.http import JsonResponse
 from django.conf import settings
 
 def home_view(request):
-    categories = Category.objects.all()
+    categories = catalog_categories()
     query = request.GET.get('q')
     selected_category = request.GET.get('category', 'all')
 
@@ -35,16 +35,14 @@ def home_view(request):
     if query:
         results = Product.objects.filter(title__icontains=query)[:10]
 
-    if selected_category == 'all':
-        popular_products = Product.objects.all()[:12]  # You can use a `popular=True` filter if available
-    else:
-        popular_products = Product.objects.filter(categories__name__iexact=selected_category)[:12]
+    # Same first page the AJAX category switch returns
+    popular_grid_html, _ = _popular_grid(selected_category)
 
     context = {
         'categories': categories,
         'query': query,
         'results': results,
-        'popular_products': popular_products,
+        'popular_grid_html': popular_grid_html,
         'selected_category': selected_category,
     }
     return render(request, "home.html", context)
@@ -58,17 +56,51 @@ def landing_view(request):
 
 from django.template.loader import render_to_string
 from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from .pagination import paginate, KeysetPage, PAGE_SIZE
+from .catalog_cache import get_or_set, cached_queryset, catalog_categories, popularity_version
 
-def filter_popular_products(request):
-    category = request.GET.get("category", "all")
+POPULAR_PAGE_SIZE = 12
 
+def _popular_listing(category):
     if category == "all":
-        products = Product.objects.all()[:12]
-    else:
-        products = Product.objects.filter(categories__name__iexact=category)[:12]
+        return Product.objects.cards()
+    return Product.objects.cards().filter(categories__name__iexact=category)
 
-    html = render_to_string("partials/popular_products_grid.html", {"products": products}, request=request)
-    return JsonResponse({"html": html})
+def _popular_grid(category, cursor=None):
+    """
+    Rendered popular grid for (category, page), cached until the catalog or
+    the popularity scores change, as a KeysetPage with no items plus the HTML.
+    """
+    def render():
+        page = paginate(_popular_listing(category), 'popular', cursor, page_size=POPULAR_PAGE_SIZE)
+        html = render_to_string("partials/popular_products_grid.html", {"products": page.items})
+        return html, page.next_cursor
+
+    html, next_cursor = get_or_set('popular-grid', render, category.lower(), cursor or '', popularity_version())
+    return mark_safe(html), KeysetPage([], next_cursor)
+
+def _next_grid_url(request, page, source, **extra):
+    """JSON URL for the chunk after `page`, carrying the current filters."""
+    if not page.has_next:
+        return None
+    params = request.GET.copy()
+    params.update(extra)
+    params['source'] = source
+    params['cursor'] = page.next_cursor
+    return f"{reverse('product_grid_page')}?{params.urlencode()}"
+
+def _stock_filter(request, products):
+    """?in_stock=1 hides sold-out products (partial index product_in_stock_idx)."""
+    if request.GET.get('in_stock'):
+        return products.in_stock()
+    return products
+
+def filter_popular_products(request):
+    category = request.GET.get("category", "all")
+    html, page = _popular_grid(category, request.GET.get("cursor"))
+    return JsonResponse({"html": html, "next_url": _next_grid_url(request, page, "popular")})
 
 
 from django.shortcuts import render
@@ -80,6 +112,22 @@ from .models import Product
 from django.shortcuts import render
 from django.db.models import Q
 from .models import Product, Category
+from .catalog_index import get_catalog_index, SIZE_OPTIONS, COLOR_OPTIONS, SLEEVE_OPTIONS, FABRIC_OPTIONS, FIT_OPTIONS, NECKLINE_OPTIONS
+
+def _new_listing(request):
+    """Products for new_view and its infinite-scroll pages, plus the facet result."""
+    facets = get_catalog_index().search(
+        sizes=request.GET.getlist('size'),
+        colors=request.GET.getlist('color'),
+        sleeves=request.GET.getlist('sleeves'),
+        fabrics=request.GET.getlist('fabric'),
+        fits=request.GET.getlist('fit'),
+        necklines=request.GET.getlist('neckline'),
+        categories=request.GET.getlist('category'),
+        min_price=request.GET.get('min_price'),
+        max_price=request.GET.get('max_price'),
+    )
+    return _stock_filter(request, facets.apply(Product.objects.cards())), facets
 
 def new_view(request):
     # Get filter parameters
@@ -91,60 +139,25 @@ def new_view(request):
     max_price = request.GET.get('max_price')
     sort_by = request.GET.get('sort')
 
-    # Base queryset
-    products = Product.objects.all()
-
-    # --- Apply size filter ---
-    if selected_sizes:
-        size_q = Q()
-        for size in selected_sizes:
-            size_q |= Q(sizes__icontains=size)
-        products = products.filter(size_q)
-
-    # --- Apply category filter ---
-    if selected_categories:
-        products = products.filter(categories__name__in=selected_categories)
-
-    # --- Apply color filter ---
-    if selected_colors:
-        products = products.filter(colors__name__in=selected_colors)
-
-    # --- Apply sleeves filter ---
-    if selected_sleeves:
-        sleeve_q = Q()
-        for sleeve in selected_sleeves:
-            sleeve_q |= Q(description__icontains=sleeve)  # Adjust this based on your model field
-        products = products.filter(sleeve_q)
-
-    # --- Apply price filters ---
-    if min_price:
-        products = products.filter(Q(discount_price__gte=min_price) | Q(price__gte=min_price))
-
-    if max_price:
-        products = products.filter(Q(discount_price__lte=max_price) | Q(price__lte=max_price))
-
-    # --- Sort logic ---
-    if sort_by == "low":
-        products = products.order_by('discount_price', 'price')
-    elif sort_by == "high":
-        products = products.order_by('-discount_price', '-price')
-    elif sort_by == "new":
-        products = products.order_by('-created_at')
-    else:
-        products = products.order_by('-id')
+    # Size / category / color / sleeve / price filters via the faceted index,
+    # then one keyset page in the requested order
+    products, facets = _new_listing(request)
+    page = paginate(products, sort_by, request.GET.get('cursor'))
 
-    # Static filter values
-    sizes = ["XS", "S", "M", "L", "XL", "XXL", "26", "28", "30", "32", "34", "36", "38", "40", "42"]
-    colors = ["Black", "White", "Grey", "Beige", "Blue", "Green", "Red", "Yellow", "Brown", "Orange"]
-    sleeves = ["Full Sleeve", "Half Sleeve", "Sleeveless"]
-    categories = Category.objects.all()
+    categories = catalog_categories()
 
     return render(request, 'new.html', {
-        'products': products.distinct(),
+        'products': page.items,
+        'page': page,
+        'next_grid_url': _next_grid_url(request, page, 'new'),
         'categories': categories,
-        'sizes': sizes,
-        'colors': colors,
-        'sleeves': sleeves,
+        'sizes': SIZE_OPTIONS,
+        'colors': COLOR_OPTIONS,
+        'sleeves': SLEEVE_OPTIONS,
+        'fabrics': FABRIC_OPTIONS,
+        'fits': FIT_OPTIONS,
+        'necklines': NECKLINE_OPTIONS,
+        'facet_counts': facets.facet_counts,
         'selected_category': 'ALL',
         'filters': {
             'sizes': selected_sizes,
@@ -216,51 +229,42 @@ from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from .models import Product, ProductColor, Category  # ✅ Added Category
 from django.db.models import Q
+from django.http import Http404
+from .product_bundle import load_product_bundle
+from .events import record_product_view, record_search, record_suggest
 
 def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug)
-
-    colors = ProductColor.objects.filter(product=product).exclude(slug__isnull=True).exclude(slug__exact='')
-    primary_color = colors.filter(is_primary=True).first() or colors.first()
-    sizes = sorted(filter(None, map(str.strip, product.sizes.split(',')))) if product.sizes else []
-
-    # ✅ Get all categories for the sidebar/menu
-    all_categories = Category.objects.all()
-
-    related_products = Product.objects.filter(
-        categories__in=product.categories.all()
-    ).exclude(id=product.id).distinct()[:4]
+    bundle = load_product_bundle(slug)
+    if bundle is None:
+        raise Http404("No Product matches the given query.")
+    record_product_view(bundle['product'].id)
 
     context = {
-        'product': product,
-        'colors': colors,
-        'primary_color': primary_color,
-        'sizes': sizes,
-        'primary_image': product.primary_image.url if product.primary_image else '',
-        'color_images': primary_color.images.all() if primary_color else [],
-        'related_products': related_products,
-        'all_categories': all_categories, # ✅ Pass to template
+        'product': bundle['product'],
+        'colors': bundle['colors'],
+        'primary_color': bundle['primary_color'],
+        'sizes': bundle['sizes'],
+        'primary_image': bundle['primary_image'],
+        'color_images': bundle['color_images'],
+        'related_products': bundle['related_products'],
+        'all_categories': catalog_categories(), # ✅ Pass to template
     }
     return render(request, 'product_detail.html', context)
 
 def product_detail_by_color(request, product_slug, color_slug):
-    product = get_object_or_404(Product, slug=product_slug)
-    color = get_object_or_404(ProductColor, product=product, slug=color_slug)
-    
-    colors = ProductColor.objects.filter(product=product).exclude(slug__isnull=True).exclude(slug__exact='')
-    sizes = sorted(filter(None, map(str.strip, product.sizes.split(',')))) if product.sizes else []
-    
-    # ✅ Get all categories here as well
-    all_categories = Category.objects.all()
+    bundle = load_product_bundle(product_slug, color_slug)
+    if bundle is None:
+        raise Http404("No Product or color matches the given query.")
+    record_product_view(bundle['product'].id)
 
     context = {
-        'product': product,
-        'colors': colors,
-        'primary_color': color,
-        'sizes': sizes,
-        'primary_image': product.primary_image.url if product.primary_image else '',
-        'color_images': color.images.all(),
-        'all_categories': all_categories, # ✅ Pass to template
+        'product': bundle['product'],
+        'colors': bundle['colors'],
+        'primary_color': bundle['primary_color'],
+        'sizes': bundle['sizes'],
+        'primary_image': bundle['primary_image'],
+        'color_images': bundle['color_images'],
+        'all_categories': catalog_categories(), # ✅ Pass to template
     }
     return render(request, 'product_detail.html', context)
 
@@ -269,13 +273,40 @@ def product_detail_by_color(request, product_slug, color_slug):
 # AJAX Endpoint to Get Images of a Color
 # -----------------------------
 def get_color_images(request, color_id):
-    try:
-        color = ProductColor.objects.get(id=color_id)
-        primary = color.product.primary_image.url if color.product.primary_image else ''
-        images = [img.image.url for img in color.images.all()]
-        return JsonResponse({'primary': primary, 'images': images})
-    except ProductColor.DoesNotExist:
+    product_slug = ProductColor.objects.filter(id=color_id).values_list('product__slug', flat=True).first()
+    image_sets = load_image_sets(product_slug) if product_slug else None
+    if image_sets is None:
         return JsonResponse({'error': 'Color not found'}, status=404)
+    data = json.loads(image_sets[0])
+    color = next((c for c in data['colors'] if c['id'] == color_id), None)
+    if color is None:
+        return JsonResponse({'error': 'Color not found'}, status=404)
+    return JsonResponse({'primary': data['primary'], 'images': [img['url'] for img in color['images']]})
+
+
+# -----------------------------
+# AJAX Endpoint: images of every color of a product in one response
+# -----------------------------
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from .product_bundle import load_image_sets
+
+IMAGE_SETS_MAX_AGE = 60 * 60 * 24
+
+def _image_sets_etag(request, slug):
+    image_sets = load_image_sets(slug)
+    return image_sets[1] if image_sets else None
+
+@cache_control(public=True, max_age=IMAGE_SETS_MAX_AGE)
+@condition(etag_func=_image_sets_etag)
+def product_image_sets(request, slug):
+    """If-None-Match is answered with a 304 by @condition before we get here."""
+    image_sets = load_image_sets(slug)
+    if image_sets is None:
+        # Raised, not returned, so the 404 skips the long Cache-Control.
+        raise Http404("No Product matches the given query.")
+    return HttpResponse(image_sets[0], content_type='application/json')
 
 
 from django.shortcuts import render, get_object_or_404
@@ -296,26 +327,42 @@ from .models import Product, Category
 def category_detail(request, slug):
     category = get_object_or_404(Category, slug=slug)
 
-    # Fetch products in this category
-    products = Product.objects.filter(categories=category).distinct()
-
-    # Static or pre-defined filter options
-    sizes = ["XS", "S", "M", "L", "XL", "XXL", "26", "28", "30", "32", "34", "36", "38", "40", "42"]
-    colors = ["Black", "White", "Grey", "Beige", "Blue", "Green", "Red", "Yellow", "Brown", "Orange"]
-    sleeves = ["Full Sleeve", "Half Sleeve", "Sleeveless"]
+    # Products in this category, narrowed by any filters from the panel
+    products, facets = _category_listing(request, category)
+    page = paginate(products, request.GET.get('sort'), request.GET.get('cursor'))
 
     # Load all categories for the category bar & filter panel
-    all_categories = Category.objects.all()
+    all_categories = catalog_categories()
 
     return render(request, 'category_detail.html', {
         'category': category,
-        'products': products,
+        'products': page.items,
+        'page': page,
+        'next_grid_url': _next_grid_url(request, page, 'category', slug=category.slug),
         'categories': all_categories,
-        'sizes': sizes,
-        'colors': colors,
-        'sleeves': sleeves,
+        'sizes': SIZE_OPTIONS,
+        'colors': COLOR_OPTIONS,
+        'sleeves': SLEEVE_OPTIONS,
+        'fabrics': FABRIC_OPTIONS,
+        'fits': FIT_OPTIONS,
+        'necklines': NECKLINE_OPTIONS,
+        'facet_counts': facets.facet_counts,
     })
 
+def _category_listing(request, category):
+    facets = get_catalog_index().search(
+        categories=[category.name],
+        sizes=request.GET.getlist('size'),
+        colors=request.GET.getlist('color'),
+        sleeves=request.GET.getlist('sleeves'),
+        fabrics=request.GET.getlist('fabric'),
+        fits=request.GET.getlist('fit'),
+        necklines=request.GET.getlist('neckline'),
+        min_price=request.GET.get('min_price'),
+        max_price=request.GET.get('max_price'),
+    )
+    return _stock_filter(request, facets.apply(Product.objects.cards())), facets
+
 
 
 
@@ -324,16 +371,19 @@ from django.db.models import Q
 from .models import Product, Category
 import re
 
-# Define trending/popular suggestions
-POPULAR_SEARCH_TERMS = [
-    "Tshirt", "White", "Oversized", "Dresses",
-    "Cotton", "Black",  "Formal", "Jeans"
-]
+from .popularity import rotating_selection
+from .suggestions import POPULAR_SEARCH_TERMS
 
 
 def search_view(request):
-    popular_categories = Category.objects.all().order_by('?')[:6]
-    popular_products = Product.objects.all().order_by('-rating', '-reviews_count')[:8]
+    # Best sellers by decayed sales (user/popularity.py), rating as the tiebreak
+    ranked_categories = cached_queryset('categories-by-popularity', Category.objects.order_by('-popularity', 'name'),
+                                        popularity_version())
+    popular_categories = rotating_selection(ranked_categories, 6)
+    popular_products = cached_queryset(
+        'best-sellers', Product.objects.cards().order_by('-popularity', '-rating', '-reviews_count')[:8],
+        popularity_version()
+    )
 
     context = {
         'popular_searches': POPULAR_SEARCH_TERMS,
@@ -369,137 +419,109 @@ def parse_price_filter(query: str):
 from django.shortcuts import render
 from django.db.models import Q
 from .models import Product, Category
+from .search_cache import search_results
 import re
 
-# Parse price filter from query string
-def parse_price_filter(query: str):
-    query = query.lower()
-    match = re.search(r'under\s+(\d+)', query)
-    if match:
-        return (None, int(match.group(1)))
-    match = re.search(r'above\s+(\d+)', query)
-    if match:
-        return (int(match.group(1)), None)
-    match = re.search(r'between\s+(\d+)\s+and\s+(\d+)', query)
-    if match:
-        return (int(match.group(1)), int(match.group(2)))
-    return None, None
-
 def search_results_view(request):
-    query = request.GET.get('q', '').strip()
-    query_lower = query.lower()
-    matched_categories = []
-
-    # Filters
-    selected_sizes = request.GET.getlist('size')
-    selected_colors = request.GET.getlist('color')
-    selected_sleeves = request.GET.getlist('sleeves')
-    selected_categories = request.GET.getlist('category')
-    min_price = request.GET.get('min_price')
-    max_price = request.GET.get('max_price')
     sort_by = request.GET.get('sort')
+    results = search_results(request.GET)
 
-    # Static filter options
-    sizes = ["XS", "S", "M", "L", "XL", "XXL", "26", "28", "30", "32", "34", "36", "38", "40", "42"]
-    colors = ["Black", "White", "Grey", "Beige", "Blue", "Green", "Red", "Yellow", "Brown", "Orange"]
-    sleeves = ["Full Sleeve", "Half Sleeve", "Sleeveless"]
-    all_categories = Category.objects.all()
-
-    products = Product.objects.all()
-
-    # Search filtering
-    if query:
-        min_price_query, max_price_query = parse_price_filter(query)
-        if min_price_query is not None:
-            min_price = min_price_query
-        if max_price_query is not None:
-            max_price = max_price_query
-
-        base_filter = (
-            Q(name__icontains=query) |
-            Q(description__icontains=query) |
-            Q(html_description__icontains=query)
-        )
+    # Pages are slices of the cached, already-ordered id list
+    page = results.page(request.GET.get('cursor'))
+    result_count = results.count
+    if not request.GET.get('cursor'):
+        record_search(results.search['query'], result_count)
 
-        matched_categories = Category.objects.filter(name__icontains=query)
-        if matched_categories.exists():
-            base_filter |= Q(categories__in=matched_categories)
+    all_categories = catalog_categories()
 
-        products = products.filter(base_filter).distinct()
-
-    # Apply filters
-    if selected_sizes:
-        products = products.filter(
-            Q(sizes__iregex=r'\b(' + '|'.join(selected_sizes) + r')\b')
-        )
+    return render(request, 'search_results.html', {
+        'query': results.search['query'],
+        'products': page.items,
+        'page': page,
+        'next_grid_url': _next_grid_url(request, page, 'search'),
+        'result_count': result_count,
+        'matched_categories': results.matched_categories,
+        'categories': all_categories,
+        'sizes': SIZE_OPTIONS,
+        'colors': COLOR_OPTIONS,
+        'sleeves': SLEEVE_OPTIONS,
+        'fabrics': FABRIC_OPTIONS,
+        'fits': FIT_OPTIONS,
+        'necklines': NECKLINE_OPTIONS,
+        'facet_counts': results.facets.facet_counts,
+        'filters': {
+            'sizes': request.GET.getlist('size'),
+            'colors': request.GET.getlist('color'),
+            'sleeves': request.GET.getlist('sleeves'),
+            'categories': request.GET.getlist('category'),
+            'min_price': results.search['min_price'],
+            'max_price': results.search['max_price'],
+            'sort_by': sort_by,
+        }
+    })
 
-    if selected_colors:
-        products = products.filter(colors__name__in=selected_colors)
 
-    if selected_sleeves:
-        products = products.filter(description__icontains=selected_sleeves[0])  # You can improve this
+# -----------------------------
+# AJAX Endpoint: next chunk of any product grid (infinite scroll)
+# -----------------------------
+def product_grid_page(request):
+    source = request.GET.get('source', 'new')
 
-    if selected_categories:
-        products = products.filter(categories__name__in=selected_categories)
+    if source == 'popular':
+        html, page = _popular_grid(request.GET.get('category', 'all'), request.GET.get('cursor'))
+    else:
+        if source == 'search':
+            page = search_results(request.GET).page(request.GET.get('cursor'))
+        else:
+            if source == 'category':
+                category = get_object_or_404(Category, slug=request.GET.get('slug', ''))
+                products, _ = _category_listing(request, category)
+            else:
+                source = 'new'
+                products, _ = _new_listing(request)
+            page = paginate(products, request.GET.get('sort'), request.GET.get('cursor'))
+        html = render_to_string("partials/popular_products_grid.html", {"products": page.items}, request=request)
 
-    if min_price:
-        products = products.filter(Q(price__gte=min_price) | Q(discount_price__gte=min_price))
+    return JsonResponse({
+        "html": html,
+        "next_url": _next_grid_url(request, page, source),
+        "has_next": page.has_next,
+    })
 
-    if max_price:
-        products = products.filter(Q(price__lte=max_price) | Q(discount_price__lte=max_price))
 
-    # Sorting
-    if sort_by == "low":
-        products = products.order_by('discount_price', 'price')
-    elif sort_by == "high":
-        products = products.order_by('-discount_price', '-price')
-    elif sort_by == "new":
-        products = products.order_by('-id')
-    else:
-        products = products.order_by('-id')
+# -----------------------------
+# Staff: catalog cache hit/miss counters (this worker only)
+# -----------------------------
+from django.contrib.admin.views.decorators import staff_member_required
+from .catalog_cache import stats as catalog_cache_stats, catalog_version
 
-    return render(request, 'search_results.html', {
-        'query': query,
-        'products': products.distinct(),
-        'result_count': products.count(),
-        'matched_categories': matched_categories,
-        'categories': all_categories,
-        'sizes': sizes,
-        'colors': colors,
-        'sleeves': sleeves,
-        'filters': {
-            'sizes': selected_sizes,
-            'colors': selected_colors,
-            'sleeves': selected_sleeves,
-            'categories': selected_categories,
-            'min_price': min_price,
-            'max_price': max_price,
-            'sort_by': sort_by,
-        }
+@staff_member_required
+def catalog_cache_report(request):
+    return JsonResponse({
+        "pid": os.getpid(),
+        "catalog_version": catalog_version(),
+        "caches": catalog_cache_stats.snapshot(),
     })
 
 
 
 
-from django.http import JsonResponse
-from .models import Product
+from django.http import JsonResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from .suggestions import suggester, normalize_prefix
 
 def search_suggestions(request):
-    query = request.GET.get('q', '')
-    products = Product.objects.filter(name__icontains=query)[:3]
-
-    data = {
-        "products": [
-            {
-                "name": p.name,
-                "slug": p.slug,
-                "image": p.primary_image.url,
-                "price_display": f"₹{p.discount_price} (₹{p.price})" if p.discount_price else f"₹{p.price}"
-            }
-            for p in products
-        ]
-    }
-    return JsonResponse(data)
+    prefix = normalize_prefix(request.GET.get('q', ''))
+    record_suggest(prefix)
+
+    etag = suggester.etag(prefix)
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified()
+
+    response = JsonResponse(suggester.suggest(prefix))
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=300)
+    return response
 
 
 import os
@@ -602,7 +624,15 @@ def course_detail(request, slug):
     enrolled = CourseEnrollment.objects.filter(user=request.user, course=course, status="active").exists()
     if not enrolled:
         return redirect("course_list")
-    return render(request, "course_detail.html", {"course": course})
+
+    # One enrollment check here; the signed URLs carry it (user/media_tokens.py)
+    videos = list(course.videos.all())
+    for video in videos:
+        video.signed_url = media_tokens.signed_url(request, 'video', video.video_file)
+    pdfs = list(course.pdfs.all())
+    for pdf in pdfs:
+        pdf.signed_url = media_tokens.signed_url(request, 'pdf', pdf.file, f"{slugify(pdf.title) or 'course'}.pdf")
+    return render(request, "course_detail.html", {"course": course, "videos": videos, "pdfs": pdfs})
 
 
 @login_required
@@ -638,10 +668,16 @@ def payment_success(request, slug):
 
 
 # views.py
-from django.http import FileResponse, Http404
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
-from .models import CourseVideo, CourseEnrollment
+from .models import CoursePDF, CourseVideo, CourseEnrollment
+
+from django.apps import apps
+from django.core.exceptions import PermissionDenied
+from django.utils.text import slugify
+from . import media_tokens
+from .streaming import serve_file
 
 @login_required
 def protected_video(request, video_id):
@@ -649,5 +685,33 @@ def protected_video(request, video_id):
     enrolled = CourseEnrollment.objects.filter(user=request.user, course=video.course, status="active").exists()
     if not enrolled:
         raise Http404("Video not found or you are not enrolled.")
-    
-    return FileResponse(video.video_file.open(), content_type="video/mp4")
+
+    # Range/conditional aware, so players can seek and resume (user/streaming.py)
+    return serve_file(request, video.video_file, "video/mp4")
+
+
+@login_required
+def protected_pdf(request, pdf_id):
+    pdf = get_object_or_404(CoursePDF.objects.select_related("course"), id=pdf_id)
+    enrolled = CourseEnrollment.objects.filter(user=request.user, course=pdf.course, status="active").exists()
+    if not enrolled:
+        raise Http404("File not found or you are not enrolled.")
+
+    return serve_file(request, pdf.file, "application/pdf", filename=f"{slugify(pdf.title) or 'course'}.pdf",
+                      as_attachment=True)
+
+
+def signed_media(request, token):
+    """
+    Course media behind a URL issued by course_detail. Authorized by the
+    token's signature alone (no login/enrollment queries), since a player
+    sends many Range requests per video.
+    """
+    try:
+        payload = media_tokens.verify(request, token)
+    except media_tokens.InvalidToken:
+        raise PermissionDenied("This link has expired or is not yours. Reload the course page.")
+    label, field_name, content_type, as_attachment = media_tokens.MEDIA_KINDS[payload['k']]
+    field = apps.get_model(label)._meta.get_field(field_name)
+    return serve_file(request, field.attr_class(None, field, payload['n']), content_type,
+                      filename=payload.get('f'), as_attachment=as_attachment)